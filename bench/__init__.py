@@ -0,0 +1,5 @@
+"""Замеры скорости компилятора на синтетических программах.
+
+generator — генератор программ по зерну, runner — прогон фаз и сравнение
+с сохранённой базой: python -m bench.runner --help
+"""
@@ -0,0 +1,182 @@
+import random
+
+# -----------------------------
+# Генератор синтетических программ
+# -----------------------------
+
+TYPES = ("%", "!", "$")
+
+# Все формы числовых литералов по типам (семантика считает дробным
+# число с '.' или 'e-', остальные — целыми)
+INT_LITERALS = (
+    lambda r: str(r.randint(0, 99999)),                             # 42
+    lambda r: format(r.randint(0, 255), "b") + r.choice("bB"),      # 1010b
+    lambda r: format(r.randint(0, 4095), "o") + r.choice("oO"),     # 17o
+    lambda r: str(r.randint(0, 9999)) + r.choice("dD"),             # 42d
+    lambda r: str(r.randint(0, 9)) + r.choice("acf") + "".join(
+        r.choice("abcdef") for _ in range(r.randint(0, 3))) + r.choice("hH"),  # 7fh
+    lambda r: str(r.randint(1, 9)) + "e" + r.choice("acf") + r.choice("hH"),   # 1eah
+    lambda r: str(r.randint(1, 99)) + r.choice("eE") + r.choice(("", "+")) + str(r.randint(0, 9)),  # 1e5
+)
+REAL_LITERALS = (
+    lambda r: f"{r.randint(0, 999)}.{r.randint(0, 999)}",                       # 3.14
+    lambda r: f"{r.randint(0, 99)}.{r.randint(0, 99)}{r.choice('eE')}{r.choice(('', '+', '-'))}{r.randint(0, 9)}",  # 2.5e+3
+    lambda r: f"{r.randint(1, 99)}{r.choice('eE')}-{r.randint(1, 9)}",          # 1e-5
+)
+
+ARITH_OPS = ("plus", "min", "mult")
+COMPARE_OPS = ("lt", "le", "gt", "ge", "ne", "eq")
+
+# Ошибки, которые можно подмешать в программу
+ERRORS = ("lexical", "syntax", "semantic")
+
+
+class ProgramGenerator:
+    """Случайные программы на языке компилятора.
+
+    seed задаёт результат полностью; var_type — тип единственного
+    объявления dim (по умолчанию выбирается по зерну), max_depth —
+    предельная вложенность операторов и выражений.
+    """
+
+    def __init__(self, seed=0, var_type=None, max_depth=4, var_count=8):
+        self.rnd = random.Random(seed)
+        self.var_type = var_type or self.rnd.choice(TYPES)
+        self.max_depth = max_depth
+        self.vars = [f"v{i}" for i in range(var_count)]
+
+    def op(self, name):
+        # Операторы-слова иногда пишутся заглавными, как в примерах
+        return name.upper() if self.rnd.random() < 0.2 else name
+
+    # ---------- литералы и выражения ----------
+
+    def literal(self, typ):
+        r = self.rnd
+        if typ == "%":
+            return r.choice(INT_LITERALS)(r)
+        if typ == "!":
+            return r.choice(REAL_LITERALS)(r)
+        return r.choice(("true", "false"))
+
+    def leaf(self, typ):
+        if typ == self.var_type and self.rnd.random() < 0.6:
+            return self.rnd.choice(self.vars)
+        return self.literal(typ)
+
+    def expr(self, typ, depth=0):
+        r = self.rnd
+        if depth >= self.max_depth or r.random() < 0.35:
+            return self.leaf(typ)
+        if r.random() < 0.1:
+            return "(" + self.expr(typ, depth + 1) + ")"
+        if typ == "$":
+            choice = r.random()
+            if choice < 0.5:
+                t = r.choice(TYPES[:2] if self.var_type == "$" else (self.var_type,) * 2 + TYPES[:2])
+                if t == "$":
+                    t = "%"
+                return f"{self.operand(t, depth + 1)} {self.op(r.choice(COMPARE_OPS))} {self.operand(t, depth + 1)}"
+            # 'not' лексер не знает (это идентификатор), поэтому его нет
+            return f"{self.operand('$', depth + 1)} {self.op(r.choice(('and', 'or')))} {self.operand('$', depth + 1)}"
+        if typ == "%":
+            return f"{self.operand('%', depth + 1)} {self.op(r.choice(ARITH_OPS))} {self.operand('%', depth + 1)}"
+        # дробное: слева дробное (делимое обязано быть дробным), справа любое число
+        left = self.operand("!", depth + 1)
+        right = self.operand(r.choice(("%", "!")), depth + 1)
+        return f"{left} {self.op(r.choice(ARITH_OPS + ('div',)))} {right}"
+
+    def operand(self, typ, depth):
+        # Составной операнд берётся в скобки, чтобы приоритеты операций
+        # не меняли тип выражения
+        text = self.expr(typ, depth)
+        return f"({text})" if " " in text else text
+
+    def value_expr(self):
+        # Значение, которое можно присвоить переменной объявленного типа
+        if self.var_type == "!":
+            return self.expr(self.rnd.choice(("%", "!")))
+        return self.expr(self.var_type)
+
+    # ---------- операторы ----------
+
+    def statement(self, depth=0):
+        r = self.rnd
+        kinds = ["assign", "assign", "input", "output"]
+        if depth < self.max_depth:
+            kinds += ["if", "for", "while"]
+            # на верхнем уровне '{' парсер принимает за конец тела
+            if depth > 0:
+                kinds.append("compound")
+        kind = r.choice(kinds)
+        if kind == "assign":
+            let = "let " if r.random() < 0.5 else ""
+            return f"{let}{r.choice(self.vars)} {self.op('eq')} {self.value_expr()}"
+        if kind == "input":
+            return "input(" + " ".join(r.sample(self.vars, r.randint(1, 3))) + ")"
+        if kind == "output":
+            return "output(" + self.expr(r.choice(TYPES)) + ")"
+        if kind == "if":
+            text = f"if {self.expr('$')} then {self.statement(depth + 1)}"
+            if r.random() < 0.5:
+                text += f" else {self.statement(depth + 1)}"
+            return text + " end_else"
+        if kind == "for":
+            v = r.choice(self.vars)
+            init = f"{v} {self.op('eq')} {self.leaf(self.var_type)}" if r.random() < 0.8 else ""
+            cond = self.expr("$") if r.random() < 0.8 else ""
+            inc = self.value_expr() if r.random() < 0.8 else ""
+            return f"for ({init}; {cond}; {inc}) {self.statement(depth + 1)}"
+        if kind == "while":
+            return f"do while {self.expr('$')} {self.statement(depth + 1)} loop"
+        body = [self.statement(depth + 1) for _ in range(r.randint(1, 4))]
+        return "{\n" + ";\n".join(body) + "\n}"
+
+    def error_statement(self, kind):
+        # Оператор с ошибкой заданного вида
+        r = self.rnd
+        v = r.choice(self.vars)
+        if kind == "lexical":
+            bad = r.choice(("102b", "89o", "1.", "12ag", "3 ⊕ 4"))
+            return f"{v} eq {bad}"
+        if kind == "syntax":
+            return r.choice((f"if {self.expr('$')} {v} eq {self.leaf(self.var_type)} end_else",
+                             f"{v} = {self.leaf(self.var_type)}",
+                             f"do while {self.expr('$')} output({v})"))
+        wrong = {"%": "true", "!": "false", "$": "1.5"}[self.var_type]
+        return r.choice((f"undeclared eq {self.leaf(self.var_type)}",
+                         f"{v} eq {wrong}",
+                         f"if {self.expr('%')} then output({v}) end_else"))
+
+    def program(self, size, error=None):
+        # Программа длиной не меньше size символов; error — вид ошибки
+        # из ERRORS, подмешиваемой в случайное место тела
+        r = self.rnd
+        header = (f"program\nvar\n\tdim {', '.join(self.vars)} {self.var_type}\n"
+                  "begin\n")
+        body, length = [], len(header)
+        while length < size or not body:
+            stmt = self.statement()
+            if r.random() < 0.05:
+                stmt = "{* комментарий " + str(len(body)) + " *} " + stmt
+            body.append(stmt)
+            length += len(stmt) + 3
+        if error is not None:
+            body.insert(r.randrange(len(body) + 1), self.error_statement(error))
+        return header + "".join("\t" + s + ";\n" for s in body) + "end."
+
+
+def generate(size, seed=0, var_type=None, error=None, max_depth=4):
+    return ProgramGenerator(seed, var_type, max_depth).program(size, error)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Генератор синтетических программ")
+    ap.add_argument("size", type=int, nargs="?", default=2000, help="длина программы в символах")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--type", choices=TYPES, default=None, help="тип переменных в dim")
+    ap.add_argument("--error", choices=ERRORS, default=None, help="подмешать ошибку")
+    ap.add_argument("--depth", type=int, default=4, help="предельная вложенность")
+    args = ap.parse_args()
+    print(generate(args.size, args.seed, args.type, args.error, args.depth))
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import tracemalloc
+from lexer import Lexer
+from parser import Parser
+from semantic import Semantic
+from vm import VM, compile_program
+from bench.generator import generate
+
+# -----------------------------
+# Прогон фаз компилятора на синтетических программах
+# -----------------------------
+
+SIZES = (10_000, 50_000, 250_000)
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Фаза и единица, на которую делится её время: лексер — токены,
+# парсер и семантика — узлы дерева, VM — выполненные команды
+PHASES = (("lex", "tokens"), ("parse", "nodes"), ("semantic", "nodes"), ("run", "instructions"))
+
+# Сколько команд VM выполнять на замер (сгенерированные программы часто
+# зацикливаются, поэтому они перезапускаются до этого числа) и что
+# отдавать их input
+RUN_STEPS = 500_000
+INPUT_WORDS = {"%": "7", "!": "2.5", "$": "true"}
+
+
+def count_nodes(root):
+    count, stack = 0, [root]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def run_once(text):
+    t0 = time.perf_counter()
+    lexer = Lexer(text)
+    tokens = lexer.tokenize()
+    t1 = time.perf_counter()
+    ast = Parser(tokens).parse_program()
+    t2 = time.perf_counter()
+    Semantic().analyze(ast)
+    t3 = time.perf_counter()
+    return (t1 - t0, t2 - t1, t3 - t2), tokens, ast, lexer.tables[3]
+
+
+def run_vm(ast, numbers, steps=RUN_STEPS):
+    # (время, число команд): программа выполняется, пока не наберётся
+    # steps команд; ошибки выполнения (деление на ноль и т. п.) просто
+    # заканчивают очередной прогон
+    bytecode = compile_program(ast, numbers)
+    word = INPUT_WORDS[bytecode.types[0]] if bytecode.types else "0"
+    done, elapsed = 0, 0.0
+    with open(os.devnull, "w") as out:
+        while done < steps:
+            vm = VM(bytecode, itertools.repeat(word), out, steps - done)
+            t0 = time.perf_counter()
+            try:
+                vm.run()
+            except Exception:
+                pass
+            elapsed += time.perf_counter() - t0
+            done += vm.steps
+    return elapsed, done
+
+
+def peak_memory(text):
+    # Пик памяти за всю компиляцию (отдельный прогон: tracemalloc
+    # замедляет выполнение и портил бы замеры времени)
+    tracemalloc.start()
+    try:
+        run_once(text)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(size, seed=0, repeat=3):
+    text = generate(size, seed)
+    best = None
+    for _ in range(repeat):
+        times, tokens, ast, numbers = run_once(text)
+        run_time, instructions = run_vm(ast, numbers)
+        times += (run_time,)
+        best = times if best is None else tuple(map(min, best, times))
+    case = {"chars": len(text), "tokens": len(tokens), "nodes": count_nodes(ast),
+            "instructions": instructions, "peak": peak_memory(text)}
+    for (phase, _), seconds in zip(PHASES, best):
+        case[phase] = seconds
+    return case
+
+
+def cost(case, phase, unit):
+    # Время фазы на единицу работы
+    return case[phase] / max(case[unit], 1)
+
+
+def report(cases, out=sys.stdout):
+    print(f"{'символов':>10} {'токенов':>9} {'узлов':>9} {'лексер ток/с':>13} "
+          f"{'парсер узл/с':>13} {'семантика узл/с':>16} {'VM ком/с':>11} {'пик памяти':>11}", file=out)
+    for case in cases.values():
+        rates = [case[unit] / max(case[phase], 1e-9) for phase, unit in PHASES]
+        print(f"{case['chars']:>10} {case['tokens']:>9} {case['nodes']:>9} {rates[0]:>13.0f} "
+              f"{rates[1]:>13.0f} {rates[2]:>16.0f} {rates[3]:>11.0f} "
+              f"{case['peak'] / (1 << 20):>9.1f}МБ", file=out)
+
+
+def check_growth(cases, max_growth):
+    # Время на единицу работы не должно заметно расти с размером входа:
+    # квадратичный алгоритм даёт рост во столько раз, во сколько вырос вход
+    problems = []
+    ordered = sorted(cases.values(), key=lambda c: c["chars"])
+    if len(ordered) < 2:
+        return problems
+    small, large = ordered[0], ordered[-1]
+    for phase, unit in PHASES + (("peak", "tokens"),):
+        growth = cost(large, phase, unit) / max(cost(small, phase, unit), 1e-12)
+        if growth > max_growth:
+            problems.append(f"НЕЛИНЕЙНЫЙ РОСТ: {phase} на {unit} при {small['chars']} → "
+                            f"{large['chars']} символов вырос в {growth:.1f} раза")
+    return problems
+
+
+def check_baseline(cases, baseline, tolerance):
+    problems = []
+    for size, case in cases.items():
+        old = baseline.get(size)
+        if old is None:
+            continue
+        for phase, unit in PHASES + (("peak", "tokens"),):
+            if phase not in old:
+                # база записана до появления этого замера
+                continue
+            ratio = cost(case, phase, unit) / max(cost(old, phase, unit), 1e-12)
+            if ratio > tolerance:
+                problems.append(f"РЕГРЕСС: {phase} при {size} символов в {ratio:.2f} раза "
+                                f"медленнее базы" if phase != "peak" else
+                                f"РЕГРЕСС: пик памяти при {size} символов в {ratio:.2f} раза больше базы")
+    return problems
+
+
+def make_arg_parser():
+    ap = argparse.ArgumentParser(description="Замеры фаз компилятора")
+    ap.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                    help="размеры программ в символах через запятую")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3,
+                    help="сколько раз повторять замер (берётся лучший)")
+    ap.add_argument("--baseline", default=BASELINE, help="файл с базовыми замерами")
+    ap.add_argument("--save", action="store_true", help="записать замеры как базу")
+    ap.add_argument("--tolerance", type=float, default=1.5,
+                    help="во сколько раз можно отстать от базы")
+    ap.add_argument("--max-growth", type=float, default=3.0,
+                    help="во сколько раз может вырасти время на токен/узел от меньшего входа к большему")
+    ap.add_argument("--json", action="store_true", help="вывести замеры в JSON")
+    return ap
+
+
+def main(argv=None):
+    args = make_arg_parser().parse_args(argv)
+    cases = {}
+    for size in map(int, args.sizes.split(",")):
+        cases[str(size)] = measure(size, args.seed, args.repeat)
+    if args.json:
+        json.dump(cases, sys.stdout, indent=2)
+        print()
+    else:
+        report(cases)
+
+    problems = check_growth(cases, args.max_growth)
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(cases, f, indent=2)
+        print("База записана в", args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            problems += check_baseline(cases, json.load(f), args.tolerance)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+import os
+import sys
+import zlib
+import pickle
+import hmac
+import hashlib
+import tempfile
+from functools import partial
+
+# Версия формата записей; меняется вручную, если меняется их структура.
+# Изменения в исходниках компилятора учитываются автоматически (compiler_version).
+CACHE_FORMAT = "2"
+
+# Предельный размер кэша по умолчанию
+CACHE_LIMIT = 64 << 20
+
+# Раз в сколько записей каталог кэша просматривается заново (размер
+# меняют и другие процессы)
+SCAN_EVERY = 256
+
+# Размер блока, которым файл читается для ключа
+HASH_BLOCK = 1 << 20
+
+# Файл секретного ключа подписи записей (в каталоге кэша)
+KEY_FILE = "secret.key"
+KEY_SIZE = 32
+
+
+def default_cache_dir():
+    # Свой каталог у каждого пользователя (записи — pickle, см. CompileCache)
+    base = os.environ.get("LOCALAPPDATA") if os.name == "nt" else None
+    base = base or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ta-compiler")
+
+
+CACHE_DIR = default_cache_dir()
+
+# Стадии, которые прошла компиляция
+LEXED, PARSED, CHECKED = 1, 2, 3
+
+# Модули, от которых зависит результат компиляции (и записи кэша: новый
+# модуль конвейера нужно добавить сюда)
+_COMPILER_MODULES = ("lexer", "parser", "semantic", "diagnostics", "literals",
+                     "vm", "optimizer", "pygen", "cache")
+_version = None
+
+
+def compiler_version():
+    # Хэш исходников компилятора: любая правка в них делает старые записи
+    # недействительными, и не нужно помнить про ручной номер версии
+    global _version
+    if _version is None:
+        h = hashlib.sha256(CACHE_FORMAT.encode())
+        for name in _COMPILER_MODULES:
+            __import__(name)
+            with open(sys.modules[name].__file__, "rb") as f:
+                h.update(f.read())
+        _version = h.hexdigest()
+    return _version
+
+
+class CompileResult:
+    """Результат компиляции одного исходника.
+
+    stage — сколько фаз пройдено без ошибок (0, LEXED, PARSED, CHECKED),
+    diagnostics — все найденные ошибки (Diagnostic), error — текст первой
+    из них или None, truncated — остановилась ли компиляция на лимите ошибок.
+    """
+
+    def __init__(self, stage=0, error=None, tokens=None, tables=None, ast=None):
+        self.stage = stage
+        self.error = error
+        self.tokens = tokens
+        self.tables = tables
+        self.ast = ast
+        self.diagnostics = []
+        self.truncated = False
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class CompileCache:
+    """Кэш результатов на диске с адресацией по содержимому.
+
+    Ключ — sha256 от байтов исходника, версии компилятора и настроек, запись —
+    pickle, сжатый zlib. Запись пишется во временный файл и переносится
+    через os.replace, поэтому параллельные процессы видят либо целую
+    запись, либо никакую. Время доступа хранится в mtime файла; когда
+    общий размер больше limit, удаляются давно не читанные записи (до 3/4
+    limit, чтобы следующие записи не вызывали удаление сразу). Размер
+    считается обходом каталога при первой записи, затем только
+    прибавляется; каталог снова просматривается, когда сумма превысила
+    limit, и раз в SCAN_EVERY записей.
+
+    pickle.loads и программы из кэша выполняют код, поэтому каталогу кэша
+    нужно доверять: писать в него должен только владелец. Каждая запись
+    подписана HMAC-SHA256 секретным ключом из KEY_FILE (создаётся с правами
+    0600), запись без верной подписи считается промахом и не
+    распаковывается. Ключ, который могут изменить другие пользователи,
+    не используется — кэш тогда не работает.
+    """
+
+    suffix = ".bin"
+
+    def __init__(self, directory=CACHE_DIR, limit=CACHE_LIMIT):
+        self.directory = directory
+        self.limit = limit
+        self.hits = 0
+        self.misses = 0
+        self._secret = None
+        self.total = None    # размер записей, None — ещё не считался
+        self.puts = 0
+
+    def hasher(self, params):
+        # params — настройки, от которых зависит результат (лимит ошибок)
+        h = hashlib.sha256(compiler_version().encode())
+        for param in params:
+            h.update(f"{param}\0".encode())
+        return h
+
+    def key(self, data, *params):
+        h = self.hasher(params)
+        h.update(data)
+        return h.hexdigest()
+
+    def file_key(self, path, *params):
+        # То же, что key(содержимое файла, ...), но файл читается блоками
+        # по HASH_BLOCK: большой исходник целиком в память не попадает
+        h = self.hasher(params)
+        with open(path, "rb") as f:
+            for block in iter(partial(f.read, HASH_BLOCK), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def secret(self):
+        # Ключ подписи, при первом обращении создаётся. OSError — ключ не
+        # прочитать или ему нельзя доверять
+        if self._secret is None:
+            path = os.path.join(self.directory, KEY_FILE)
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                os.makedirs(self.directory, mode=0o700, exist_ok=True)
+                try:
+                    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                except FileExistsError:
+                    # ключ только что создал другой процесс
+                    fd = os.open(path, os.O_RDONLY)
+                else:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(os.urandom(KEY_SIZE))
+                    fd = os.open(path, os.O_RDONLY)
+            with os.fdopen(fd, "rb") as f:
+                st = os.fstat(f.fileno())
+                if hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o022):
+                    raise PermissionError(f"ключ кэша {path} доступен для записи другим")
+                secret = f.read()
+            if len(secret) != KEY_SIZE:
+                raise OSError(f"повреждён ключ кэша {path}")
+            self._secret = secret
+        return self._secret
+
+    def sign(self, data):
+        return hmac.new(self.secret(), data, hashlib.sha256).digest()
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                mac = f.read(hashlib.sha256().digest_size)
+                data = f.read()
+            if not hmac.compare_digest(mac, self.sign(data)):
+                # подделанная или чужая запись не распаковывается
+                self.misses += 1
+                return None
+            record = pickle.loads(zlib.decompress(data))
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # повреждённая или чужая запись — как промах
+            self.misses += 1
+            return None
+        self.hits += 1
+        return record
+
+    def put(self, key, record):
+        data = zlib.compress(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+        mac = self.sign(data)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(mac)
+                f.write(data)
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        self.puts += 1
+        if self.total is None or self.puts % SCAN_EVERY == 0:
+            self.evict()
+        else:
+            # перезапись той же записи учитывается дважды: это только
+            # приближает следующий просмотр каталога
+            self.total += len(mac) + len(data)
+            if self.total > self.limit:
+                self.evict()
+
+    def entries(self):
+        # (время доступа, размер, путь) всех записей
+        result = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return result
+        for name in names:
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            result.append((st.st_mtime, st.st_size, path))
+        return result
+
+    def evict(self):
+        entries = self.entries()
+        total = self.total = sum(size for _, size, _ in entries)
+        if total <= self.limit:
+            return
+        target = self.limit * 3 // 4
+        entries.sort()
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # запись уже удалил другой процесс
+                pass
+            total -= size
+        self.total = total
+
+    def clear(self):
+        removed = 0
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        self.total = None
+        return removed
@@ -1,35 +1,408 @@
+import os
+import io
 import sys
-from lexer import Lexer
+import stat
+import glob
+import fnmatch
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from lexer import Lexer, make_sink
 from parser import Parser
 from semantic import Semantic
+from diagnostics import Diagnostics, ParseAbort, TooManyErrors, MAX_ERRORS
+from vm import VM, compile_program, read_words
+from pygen import compile_python
+from optimizer import optimize
+from stats import (CompileStats, MemoryBudget, no_phase,
+                   LEX_BYTES_PER_CHAR, PARSE_BYTES_PER_TOKEN)
+from cache import CompileCache, CompileResult, CACHE_DIR, LEXED, PARSED, CHECKED
 
-def run_compiler(filename):
+def read_source(path):
+    # Исходник для compile_file: путь обычного файла как есть, а канал,
+    # FIFO или /dev/stdin читаются один раз целиком — их байты нужны и для
+    # ключа кэша, и лексеру, а прочитать поток второй раз нельзя
+    if isinstance(path, bytes) or stat.S_ISREG(os.stat(path).st_mode):
+        return path
+    with open(path, "rb") as f:
+        return f.read()
+
+def source_key(cache, source, *params):
+    # Ключ кэша по байтам исходника (source — см. read_source)
+    if isinstance(source, bytes):
+        return cache.key(source, *params)
+    return cache.file_key(source, *params)
+
+def compile_file(path, cache=None, stats=None, budget=None, max_errors=MAX_ERRORS):
+    # Лексический, синтаксический и семантический анализ файла.
+    # path — путь или уже прочитанные байты исходника (read_source).
+    # Ошибки чтения не перехватываются; ошибки компиляции (до max_errors,
+    # 0 — без предела) попадают в result.diagnostics, парсер и анализатор
+    # после ошибки продолжают работу. С cache повторная компиляция того же текста не нужна,
+    # в stats (CompileStats) записываются время фаз и счётчики, budget
+    # (MemoryBudget) останавливает компиляцию, которой не хватит памяти.
+    phase = stats.phase if stats is not None else no_phase
+    source = read_source(path)
+    key = None
+    if cache is not None:
+        with phase("cache"):
+            key = source_key(cache, source, max_errors)
+            result = cache.get(key)
+        if result is not None:
+            if stats is not None:
+                count_result(stats, result)
+            return result
+    result = CompileResult()
+    diagnostics = Diagnostics(max_errors)
+    sema = Semantic(diagnostics)
+    progress = None
+    if budget is not None:
+        budget.start()
+        progress = lambda tokens: budget.check("лексический анализ")
     try:
-        filetext = open(filename, "r", encoding="utf-8").read()
+        # Лексический анализ (файл читается блоками)
+        lexer = Lexer("")
+        if isinstance(source, bytes):
+            size, source = len(source), io.BytesIO(source)
+        else:
+            size = os.path.getsize(source)
+        if budget is not None:
+            budget.expect("лексический анализ", size * LEX_BYTES_PER_CHAR)
+        with phase("lex"):
+            result.tokens = lexer.tokenize_file(source, progress=progress)
+        result.tables = lexer.tables
+        result.stage = LEXED
+        # Синтаксический анализ
+        if budget is not None:
+            budget.expect("синтаксический анализ", len(result.tokens) * PARSE_BYTES_PER_TOKEN)
+        with phase("parse"):
+            result.ast = Parser(result.tokens, diagnostics).parse_program()
+        if not diagnostics:
+            result.stage = PARSED
+        if budget is not None:
+            budget.check("синтаксический анализ")
+        # Семантический анализ (и при синтаксических ошибках, если
+        # объявления разобраны: так видны все ошибки сразу)
+        if result.ast.children[0].kind == "decl":
+            with phase("semantic"):
+                sema.analyze(result.ast)
+            if not diagnostics:
+                result.stage = CHECKED
+    except (OSError, UnicodeDecodeError):
+        raise
+    except (ParseAbort, TooManyErrors):
+        pass
     except Exception as e:
-        print("Ошибка чтения файла:", e); sys.exit(1)
+        diagnostics.add(e)
+    result.diagnostics = diagnostics.items
+    result.truncated = diagnostics.truncated
+    if diagnostics:
+        result.error = diagnostics[0].message
+    if stats is not None:
+        count_result(stats, result, len(sema.symbols.table))
+    if cache is not None and not (result.diagnostics and result.diagnostics[-1].phase == "budget"):
+        # отказ по бюджету зависит от предела, а не от текста программы
+        try:
+            cache.put(key, result)
+        except (OSError, RecursionError):
+            # без записи в кэш компиляция всё равно удалась
+            pass
+    return result
+
+def count_result(stats, result, symbols=None):
+    if result.tokens is not None:
+        stats.count_tokens(result.tokens, result.tables)
+    if result.ast is not None:
+        stats.count_tree(result.ast)
+        if symbols is None and result.stage >= CHECKED:
+            # из кэша: все объявления прошли проверку
+            symbols = len(result.ast.children[0].children)
+    if symbols is not None:
+        stats.count_symbols(symbols)
+
+def print_stats(stats, fmt):
+    if fmt == "json":
+        print(json.dumps(stats.as_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(stats.format_table())
+
+def output_stream():
+    # stdout с большим буфером: output программы не сбрасывается на
+    # каждой строке, даже если stdout — терминал
     try:
-        # Лексический анализ
-        lexer = Lexer(filetext)
-        lexemes = lexer.tokenize()
-        print("Лексический анализ завершён.")
-        # Синтаксический анализ
-        parser = Parser(lexemes)
-        ast = parser.parse_program()
-        print("Синтаксический анализ завершён.")
-        # Семантический анализ
-        sema = Semantic()
-        errors = sema.analyze(ast)
-        if errors:
-            print("Semantic check: FAILED")
-            for e in errors:
-                print(" -", e)
-        print("Семантический анализ завершён. Программа корректна.")
+        fd = sys.stdout.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return sys.stdout
+    sys.stdout.flush()
+    return open(fd, "w", buffering=1 << 16, encoding=sys.stdout.encoding,
+                errors=sys.stdout.errors, closefd=False)
+
+def python_program(path, result, cache=None, optimized=True):
+    # Программа, переведённая в Python (pygen), — из кэша по хэшу
+    # исходника (path — как в compile_file) или заново; None, если её может
+    # выполнить только VM. optimized — прошло ли дерево через optimizer
+    key = None
+    if cache is not None:
+        key = source_key(cache, path, "python", sys.version, optimized)
+        program = cache.get(key)
+        if program is not None:
+            return program
+    program = compile_python(result.ast)
+    if program is not None and key is not None:
+        try:
+            cache.put(key, program)
+        except OSError:
+            # без записи в кэш программа всё равно выполнится
+            pass
+    return program
+
+def execute(path, result, stats=None, max_steps=None, backend="python", cache=None,
+            optimized=True):
+    # Выполнение проверенной программы: backend "python" — переводом в
+    # Python (pygen), "vm" — на стековой машине (только она считает
+    # команды и соблюдает max_steps). С optimized дерево сначала проходит
+    # через optimizer (свёртка констант, недостижимые ветки). input читает
+    # слова из stdin, output пишет в буферизованный stdout
+    phase = stats.phase if stats is not None else no_phase
+    if optimized:
+        with phase("optimize"):
+            _, counts = optimize(result.ast)
+        if stats is not None:
+            stats.count_optimizer(counts)
+    with phase("codegen"):
+        program = python_program(path, result, cache, optimized) if backend == "python" else None
+        if program is None:
+            bytecode = compile_program(result.ast, result.tables[3])
+    inp = read_words(sys.stdin)
+    out = output_stream()
+    vm = None
+    try:
+        with phase("run"):
+            if program is not None:
+                program.run(inp, out)
+            else:
+                vm = VM(bytecode, inp, out, max_steps)
+                vm.run()
+    except Exception as e:
+        out.flush()
+        print(e)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        sys.stdout.flush()
+        if stats is not None and vm is not None:
+            stats.count_instructions(vm.steps)
+
+def run_compiler(filename, refs=None, cache=None, profile=None, memory=False, budget=None,
+                 max_errors=MAX_ERRORS, errors_format="text", run=False, max_steps=None,
+                 backend="python", optimized=True):
+    stats = CompileStats(memory=memory) if profile or memory else None
+    try:
+        try:
+            # канал читается здесь один раз: исходник нужен и для --run
+            source = read_source(filename)
+            result = compile_file(source, cache, stats, budget, max_errors)
+        except (OSError, UnicodeDecodeError) as e:
+            print("Ошибка чтения файла:", e); sys.exit(1)
+        if result.stage >= LEXED:
+            if refs is not None:
+                sink = make_sink(refs)
+                sink.emit(result.tokens)
+                if sink is not refs:
+                    sink.close()
+            print("Лексический анализ завершён.")
+        if result.stage >= PARSED:
+            print("Синтаксический анализ завершён.")
+        if result.stage >= CHECKED:
+            print("Семантический анализ завершён. Программа корректна.")
+            if run:
+                execute(source, result, stats, max_steps, backend, cache, optimized)
+        if errors_format == "json":
+            print(json.dumps([d.as_dict() for d in result.diagnostics], ensure_ascii=False, indent=2))
+        else:
+            for d in result.diagnostics:
+                print("Ошибка компиляции:", d)
+            if len(result.diagnostics) > 1:
+                print(f"Найдено ошибок: {len(result.diagnostics)}"
+                      + (" (достигнут предел --max-errors, дальше не проверялось)"
+                         if result.truncated else ""))
     except Exception as e:
         print("Ошибка компиляции:", e)
+    if stats is not None:
+        print_stats(stats, profile or "table")
+
+# -----------------------------
+# Пакетный режим
+# -----------------------------
+
+def expand_sources(args, pattern="*.txt"):
+    # Файлы, каталоги (обходятся рекурсивно, берутся файлы по pattern)
+    # и шаблоны glob. Порядок детерминирован, повторы убираются.
+    paths, seen = [], set()
+    for arg in args:
+        if os.path.isdir(arg):
+            found = []
+            for root, dirs, files in os.walk(arg):
+                dirs.sort()
+                found.extend(os.path.join(root, f) for f in sorted(files)
+                             if fnmatch.fnmatch(f, pattern))
+        elif glob.has_magic(arg):
+            found = sorted(p for p in glob.glob(arg, recursive=True) if os.path.isfile(p))
+        else:
+            found = [arg]
+        for p in found:
+            if p not in seen:
+                seen.add(p)
+                paths.append(p)
+    return paths
+
+# Кэши процесса по каталогам: размер кэша считается один раз на процесс,
+# а не на каждый файл пакета
+_caches = {}
+
+def process_cache(cache_dir):
+    cache = _caches.get(cache_dir)
+    if cache is None:
+        cache = _caches[cache_dir] = CompileCache(cache_dir)
+    return cache
+
+def check_file(path, cache_dir=None, budget=None, max_errors=MAX_ERRORS):
+    # Полная проверка одного файла без печати. Результат: (путь, текст
+    # первой ошибки или None, число токенов, размер, взят ли из кэша, время)
+    t0 = time.perf_counter()
+    cache = process_cache(cache_dir) if cache_dir else None
+    hits = cache.hits if cache is not None else 0
+    budget = MemoryBudget(budget) if budget else None
+    tokens = size = 0
+    cached = False
+    try:
+        size = os.path.getsize(path)
+        result = compile_file(path, cache, budget=budget, max_errors=max_errors)
+        tokens = len(result.tokens) if result.tokens is not None else 0
+        cached = cache is not None and cache.hits > hits
+        error = None if result.ok else f"Ошибка компиляции: {result.error}"
+        if len(result.diagnostics) > 1:
+            error += f" (всего ошибок: {len(result.diagnostics)})"
+    except (OSError, UnicodeDecodeError) as e:
+        error = f"Ошибка чтения файла: {e}"
+    return path, error, tokens, size, cached, time.perf_counter() - t0
+
+def run_batch(paths, workers=None, chunksize=None, cache_dir=None, budget=None,
+              max_errors=MAX_ERRORS, out=sys.stdout):
+    # Проверка многих файлов в пуле процессов. Результаты печатаются
+    # в порядке paths, независимо от того, какой процесс закончил раньше.
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(paths) // (workers * 4))
+    t0 = time.perf_counter()
+    failed = []
+    total_tokens = total_size = hits = 0
+    check = partial(check_file, cache_dir=cache_dir, budget=budget, max_errors=max_errors)
+    if workers == 1 or len(paths) < 2:
+        results = map(check, paths)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(check, paths, chunksize=chunksize)
+    try:
+        for path, error, tokens, size, cached, _ in results:
+            total_tokens += tokens
+            total_size += size
+            hits += cached
+            if error is None:
+                print(f"{path}: OK", file=out)
+            else:
+                failed.append((path, error))
+                print(f"{path}: {error}", file=out)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    elapsed = time.perf_counter() - t0
+
+    print("=" * 40, file=out)
+    print(f"Файлов: {len(paths)}, корректных: {len(paths) - len(failed)}, с ошибками: {len(failed)}"
+          + (f", из кэша: {hits}" if cache_dir else ""), file=out)
+    for path, error in failed:
+        print(f" - {path}: {error}", file=out)
+    rate = elapsed or 1e-9
+    print(f"Время: {elapsed:.3f} с, процессов: {workers}, "
+          f"{len(paths) / rate:.1f} файлов/с, {total_tokens / rate:.0f} токенов/с, "
+          f"{total_size / rate / (1 << 20):.2f} МБ/с", file=out)
+    return failed
+
+def make_arg_parser():
+    ap = argparse.ArgumentParser(description="Учебный компилятор")
+    ap.add_argument("files", nargs="*", metavar="file",
+                    help="файл с исходным кодом; несколько файлов, каталоги или шаблоны glob — пакетный режим")
+    ap.add_argument("--refs", metavar="КУДА", default=None,
+                    help="вывести пары (таблица, номер): '-' — в stdout, иначе путь к файлу")
+    ap.add_argument("-j", "--jobs", type=int, default=None,
+                    help="число процессов в пакетном режиме (по умолчанию — число ядер)")
+    ap.add_argument("--chunksize", type=int, default=None,
+                    help="сколько файлов отдавать процессу за раз")
+    ap.add_argument("--pattern", default="*.txt",
+                    help="какие файлы брать из каталогов (по умолчанию *.txt)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="не использовать кэш результатов")
+    ap.add_argument("--clear-cache", action="store_true",
+                    help="очистить кэш результатов")
+    ap.add_argument("--cache-dir", default=CACHE_DIR,
+                    help=f"каталог кэша (по умолчанию {CACHE_DIR}); записи из него "
+                         "распаковываются pickle, писать в него должен только владелец")
+    ap.add_argument("--profile", nargs="?", const="table", choices=("table", "json"),
+                    help="время фаз и счётчики компиляции (таблицей или в JSON)")
+    ap.add_argument("--memory", action="store_true",
+                    help="пик и остаток памяти по фазам и главные места выделения (tracemalloc)")
+    ap.add_argument("--memory-budget", type=float, metavar="МБ", default=None,
+                    help="остановить компиляцию, если ей нужно больше памяти")
+    ap.add_argument("--max-errors", type=int, metavar="N", default=MAX_ERRORS,
+                    help=f"остановиться после N ошибок (по умолчанию {MAX_ERRORS}, 0 — без предела, "
+                         "1 — на первой ошибке)")
+    ap.add_argument("--errors", choices=("text", "json"), default="text",
+                    help="как выводить ошибки: текстом или списком JSON с фазой и позицией")
+    ap.add_argument("--run", action="store_true",
+                    help="выполнить программу после проверки (input — из stdin, output — в stdout)")
+    ap.add_argument("--max-steps", type=int, metavar="N", default=None,
+                    help="остановить выполнение после N команд (только --backend vm)")
+    ap.add_argument("--backend", choices=("python", "vm"), default=None,
+                    help="чем выполнять --run: переводом в Python (по умолчанию) "
+                         "или на VM (по умолчанию с --max-steps)")
+    ap.add_argument("--no-optimize", action="store_true",
+                    help="выполнять без свёртки констант и удаления недостижимых веток")
+    return ap
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Использование: python compiler.py <имя_файла>")
+    ap = make_arg_parser()
+    args = ap.parse_args()
+    if args.clear_cache:
+        print("Удалено записей кэша:", CompileCache(args.cache_dir).clear())
+        if not args.files:
+            sys.exit(0)
+    if not args.files:
+        ap.error("не указан ни один файл")
+    cache_dir = None if args.no_cache else args.cache_dir
+    budget = int(args.memory_budget * (1 << 20)) if args.memory_budget else None
+    single = len(args.files) == 1 and not os.path.isdir(args.files[0]) \
+        and not glob.has_magic(args.files[0])
+    if args.backend == "python" and args.max_steps is not None:
+        ap.error("--max-steps работает только с --backend vm")
+    backend = args.backend or ("vm" if args.max_steps is not None else "python")
+    if single:
+        run_compiler(args.files[0], refs=args.refs,
+                     cache=CompileCache(cache_dir) if cache_dir else None,
+                     profile=args.profile, memory=args.memory,
+                     budget=MemoryBudget(budget) if budget else None,
+                     max_errors=args.max_errors, errors_format=args.errors,
+                     run=args.run, max_steps=args.max_steps, backend=backend,
+                     optimized=not args.no_optimize)
     else:
-        run_compiler(sys.argv[1])
\ No newline at end of file
+        if args.profile or args.memory or args.run:
+            ap.error("--profile, --memory и --run работают только для одного файла")
+        paths = expand_sources(args.files, args.pattern)
+        if not paths:
+            print("Не найдено ни одного файла"); sys.exit(1)
+        failed = run_batch(paths, workers=args.jobs, chunksize=args.chunksize,
+                           cache_dir=cache_dir, budget=budget, max_errors=args.max_errors)
+        sys.exit(1 if failed else 0)
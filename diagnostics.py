@@ -0,0 +1,106 @@
+# Лимит ошибок по умолчанию
+MAX_ERRORS = 20
+
+
+class CompileError(Exception):
+    """Ошибка лексера, парсера или анализатора: текст сообщения, фаза
+    (lexical, syntax или semantic) и позиция (строка, столбец) — их
+    задаёт место, где ошибка найдена, и по ним строится Diagnostic."""
+
+    def __init__(self, message, phase, pos=None):
+        super().__init__(message)
+        self.phase = phase
+        self.pos = pos
+
+
+class BudgetExceeded(CompileError):
+    """Компиляции не хватит памяти (stats.MemoryBudget): фаза budget,
+    позиции нет."""
+
+    def __init__(self, message):
+        super().__init__(message, "budget")
+
+
+class Diagnostic:
+    """Одна ошибка: фаза (lexical, syntax, semantic, budget или error), полный текст
+    сообщения, как в исключениях, и позиция (строка, столбец) или None."""
+
+    def __init__(self, phase, message, pos=None):
+        self.phase = phase
+        self.message = message
+        self.pos = pos
+
+    @classmethod
+    def from_exception(cls, error):
+        # Фаза и позиция — из CompileError; у прочих ошибок фаза error
+        # и позиции нет
+        if isinstance(error, CompileError):
+            return cls(error.phase, str(error), error.pos)
+        return cls("error", str(error))
+
+    @property
+    def line(self):
+        return self.pos[0] if self.pos else None
+
+    @property
+    def col(self):
+        return self.pos[1] if self.pos else None
+
+    def as_dict(self):
+        return {"phase": self.phase, "message": self.message,
+                "line": self.line, "col": self.col}
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"Diagnostic({self.phase}, {self.message!r})"
+
+
+class TooManyErrors(Exception):
+    """Набрано max_errors ошибок, дальше компиляция не идёт."""
+
+
+class ParseAbort(Exception):
+    """Разбор не может продолжиться (ошибка уже записана)."""
+
+
+class Cancelled(BaseException):
+    """Компиляция отменена (cancel у Lexer, Parser или Semantic).
+
+    Как и KeyboardInterrupt, это не Exception: обработчики ошибок
+    компиляции (except Exception) её не перехватывают.
+    """
+
+
+class Diagnostics:
+    """Список ошибок одной компиляции.
+
+    Парсер и анализатор, получив его, не останавливаются на первой ошибке,
+    а записывают её сюда (report) и продолжают. На max_errors-й ошибке
+    report поднимает TooManyErrors.
+    """
+
+    def __init__(self, max_errors=MAX_ERRORS):
+        self.items = []
+        self.max_errors = max_errors
+        self.truncated = False
+
+    def add(self, error):
+        # без проверки лимита (ошибка, после которой компиляция и так встала)
+        self.items.append(Diagnostic.from_exception(error))
+
+    def report(self, error):
+        self.add(error)
+        if self.max_errors and len(self.items) >= self.max_errors:
+            self.truncated = True
+            raise TooManyErrors(f"Слишком много ошибок ({len(self.items)}), компиляция остановлена")
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
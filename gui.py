@@ -2,16 +2,23 @@
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 import sys
 import os
-import struct
+from functools import partial
 
 # Добавляем текущую директорию в путь для импорта
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Вывод во вкладки (нужен и в демо-режиме)
+from views import Rows, RowView, AstView
+
 # Пробуем импортировать модули с обработкой ошибок
 try:
-    from lexer import Lexer, KEYWORDS, DELIMITER_TABLE
+    from lexer import Lexer, TokenBuffer, KEYWORDS, DELIMITER_TABLE
+    from literals import binary_texts
     from parser import Parser
     from semantic import Semantic
+    from stats import CompileStats
+    from diagnostics import Cancelled
+    from worker import CompileWorker, check_cancel
     MODULES_LOADED = True
 except ImportError as e:
     print(f"Внимание: не удалось загрузить модули: {e}")
@@ -23,6 +30,12 @@ class SimpleCompilerGUI:
         self.root = root
         self.root.title("Учебный компилятор")
         self.root.geometry("1200x700")
+        # Результаты прошлой компиляции (для инкрементального разбора)
+        self.lexer = None
+        self.tokens = None
+        self.damage = None
+        self.ast = None
+        self.sema = None
         
         # Проверяем наличие модулей
         if not MODULES_LOADED:
@@ -31,6 +44,8 @@ class SimpleCompilerGUI:
                 "GUI будет работать в демо-режиме.")
         
         self.create_widgets()
+        # Фоновая компиляция (сообщения забираются через root.after)
+        self.worker = CompileWorker(self.root, self.on_message) if MODULES_LOADED else None
     
     def create_widgets(self):
         # Панель управления
@@ -46,6 +61,14 @@ class SimpleCompilerGUI:
                  command=self.run_compilation, bg="#2196F3", fg="white",
                  font=("Arial", 10, "bold")).pack(side="left", padx=5)
         
+        tk.Button(control_frame, text="⏹ Отменить", 
+                 command=self.cancel_compilation, bg="#FF9800", fg="white",
+                 font=("Arial", 10, "bold")).pack(side="left", padx=5)
+        
+        tk.Button(control_frame, text="💾 Сохранить AST", 
+                 command=self.save_ast, bg="#607D8B", fg="white",
+                 font=("Arial", 10, "bold")).pack(side="left", padx=5)
+        
         tk.Button(control_frame, text="🗑 Очистить все", 
                  command=self.clear_all, bg="#f44336", fg="white",
                  font=("Arial", 10, "bold")).pack(side="left", padx=5)
@@ -73,6 +96,7 @@ class SimpleCompilerGUI:
                                                     font=("Courier New", 10),
                                                     height=10)
         self.tokens_text.pack(fill="both", expand=True)
+        self.tokens_view = RowView(self.tokens_text, self.tokens_text.vbar)
         center_paned.add(tokens_frame)
         
         # Таблицы
@@ -83,6 +107,7 @@ class SimpleCompilerGUI:
         table_notebook = ttk.Notebook(tables_frame)
         
         self.table_texts = {}
+        self.table_views = {}
         table_names = ["Ключевые слова", "Разделители", "Числа", "Идентификаторы"]
         
         for i, name in enumerate(table_names, 1):
@@ -92,6 +117,14 @@ class SimpleCompilerGUI:
             text.pack(fill="both", expand=True)
             table_notebook.add(frame, text=name)
             self.table_texts[i] = text
+            self.table_views[i] = RowView(text, text.vbar)
+
+        # Статистика последней компиляции
+        frame = tk.Frame(table_notebook)
+        self.stats_text = scrolledtext.ScrolledText(frame, wrap="none",
+                                                    font=("Courier New", 10), height=8)
+        self.stats_text.pack(fill="both", expand=True)
+        table_notebook.add(frame, text="Статистика")
         
         table_notebook.pack(fill="both", expand=True, padx=2, pady=2)
         center_paned.add(tables_frame)
@@ -104,10 +137,9 @@ class SimpleCompilerGUI:
         # AST
         ast_frame = tk.LabelFrame(right_paned, text="AST (Абстрактное синтаксическое дерево)", 
                                  font=("Arial", 10, "bold"), padx=5, pady=5)
-        self.ast_text = scrolledtext.ScrolledText(ast_frame, wrap="word",
-                                                 font=("Courier New", 9),
-                                                 height=15)
-        self.ast_text.pack(fill="both", expand=True)
+        # узлы раскрываются по щелчку, двойной щелчок — к месту в коде
+        self.ast_view = AstView(ast_frame, self.source_text)
+        self.ast_view.frame.pack(fill="both", expand=True)
         right_paned.add(ast_frame)
         
         # Лог
@@ -146,126 +178,30 @@ class SimpleCompilerGUI:
     
     def clear_all(self):
         self.source_text.delete(1.0, "end")
-        self.tokens_text.delete(1.0, "end")
-        for text_widget in self.table_texts.values():
-            text_widget.delete(1.0, "end")
-        self.ast_text.delete(1.0, "end")
-        self.log_text.delete(1.0, "end")
+        self.clear_results()
         self.status_var.set("Все поля очищены")
     
+    def save_ast(self):
+        if self.ast_view.root is None:
+            messagebox.showwarning("Внимание", "AST ещё не построено!")
+            return
+        filename = filedialog.asksaveasfilename(
+            title="Сохранить AST",
+            defaultextension=".txt",
+            filetypes=[("Текстовые файлы", "*.txt"), ("Все файлы", "*.*")]
+        )
+        if filename:
+            try:
+                # дерево пишется в файл по узлу, без общей строки
+                with open(filename, "w", encoding="utf-8") as f:
+                    self.ast_view.export(f)
+                self.status_var.set(f"AST сохранено: {os.path.basename(filename)}")
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить AST: {str(e)}")
+    
     def log(self, message):
         self.log_text.insert("end", message + "\n")
         self.log_text.see("end")
-        self.root.update()
-    
-    def int_to_binary(self, num_str):
-        """Преобразует целое число в двоичное представление"""
-        try:
-            # Убираем пробелы и преобразуем в нижний регистр
-            clean_num = num_str.strip().lower()
-            
-            # Обрабатываем разные системы счисления
-            if clean_num.endswith('b'):
-                # Двоичное число
-                base_num = clean_num[:-1]
-                decimal_val = int(base_num, 2)
-                return f"{num_str} (десятичное: {decimal_val})"
-            
-            elif clean_num.endswith('o'):
-                # Восьмеричное число
-                base_num = clean_num[:-1]
-                decimal_val = int(base_num, 8)
-                binary_val = bin(decimal_val)[2:]  # убираем '0b'
-                return f"{binary_val}"
-            
-            elif clean_num.endswith('h'):
-                # Шестнадцатеричное число
-                base_num = clean_num[:-1]
-                decimal_val = int(base_num, 16)
-                binary_val = bin(decimal_val)[2:]
-                return f"{binary_val}"
-            
-            elif clean_num.endswith('d'):
-                # Десятичное число с суффиксом
-                base_num = clean_num[:-1]
-                decimal_val = int(base_num)
-                binary_val = bin(decimal_val)[2:]
-                return f"{binary_val}"
-            
-            else:
-                # Десятичное число без суффикса
-                decimal_val = int(clean_num)
-                binary_val = bin(decimal_val)[2:]
-                return f"{binary_val}"
-                
-        except Exception as e:
-            return f"{num_str} (ошибка преобразования: {str(e)})"
-    
-    def float_to_binary(self, num_str):
-        """Преобразует вещественное число в двоичное представление IEEE 754"""
-        try:
-            # Преобразуем строку в float
-            clean_num = num_str.strip().lower()
-            float_val = float(clean_num)
-            
-            # Получаем двоичное представление float (32 бита)
-            # Используем одинарную точность для компактности
-            binary_repr = ''.join(f'{c:08b}' for c in struct.pack('!f', float_val))
-            
-            # Разделяем на компоненты IEEE 754:
-            # 1 бит знака, 8 бит экспоненты, 23 бита мантиссы
-            sign_bit = binary_repr[0]
-            exponent_bits = binary_repr[1:9]
-            mantissa_bits = binary_repr[9:]
-            
-            # Преобразуем экспоненту и мантиссу в десятичные значения
-            exponent = int(exponent_bits, 2) - 127  # Смещение экспоненты
-            
-            # Вычисляем мантиссу
-            mantissa = 1.0
-            for i, bit in enumerate(mantissa_bits):
-                if bit == '1':
-                    mantissa += 2 ** (-(i + 1))
-            
-            # Формируем результат
-            result = f"{num_str}\n"
-            result += f"{sign_bit}{exponent_bits}{mantissa_bits}\n"
-            #result += f"  Знак: {'-' if sign_bit == '1' else '+'}\n"
-            #result += f"  Экспонента: {exponent_bits} (десятичная: {exponent})\n"
-            #result += f"  Мантисса: 1.{mantissa_bits}\n"
-            #result += f"  Значение: {'-' if sign_bit == '1' else ''}{mantissa} × 2^{exponent}"
-            
-            return result
-            
-        except Exception as e:
-            return f"{num_str} (ошибка преобразования: {str(e)})"
-    
-    def number_to_binary(self, num_str):
-        """Преобразует число в двоичное представление"""
-        try:
-            clean_num = num_str.strip().lower()
-            
-            # Проверяем, является ли число вещественным
-            is_float = False
-            if '.' in clean_num or 'e' in clean_num:
-                # Убираем суффиксы для проверки
-                temp_num = clean_num
-                for suffix in ['b', 'o', 'h', 'd']:
-                    if temp_num.endswith(suffix):
-                        temp_num = temp_num[:-1]
-                        break
-                
-                # Проверяем, содержит ли оставшаяся часть точку или 'e'
-                if '.' in temp_num or 'e' in temp_num:
-                    is_float = True
-            
-            if is_float:
-                return self.float_to_binary(clean_num)
-            else:
-                return self.int_to_binary(clean_num)
-                
-        except Exception as e:
-            return f"{num_str} (ошибка преобразования: {str(e)})"
     
     def run_compilation(self):
         if not MODULES_LOADED:
@@ -274,127 +210,174 @@ class SimpleCompilerGUI:
                 "lexer.py, parser.py и semantic.py находятся в той же папке.")
             return
         
-        # Очищаем предыдущие результаты
-        self.tokens_text.delete(1.0, "end")
-        for text_widget in self.table_texts.values():
-            text_widget.delete(1.0, "end")
-        self.ast_text.delete(1.0, "end")
-        self.log_text.delete(1.0, "end")
-        
         source = self.source_text.get(1.0, "end-1c")
         if not source.strip():
             messagebox.showwarning("Внимание", "Исходный код пуст!")
             return
         
+        # Очищаем предыдущие результаты
+        self.clear_results()
+        self.log("=== Начало компиляции ===")
+        # Компиляция идёт в фоновом потоке; если предыдущая ещё не
+        # закончилась, она отменяется, и применяется только эта
+        self.worker.submit(partial(self.compile_job, source))
+    
+    def cancel_compilation(self):
+        # в демо-режиме (модули не загружены) worker нет
+        if self.worker is not None and self.worker.cancel():
+            self.status_var.set("Отмена компиляции...")
+        else:
+            self.status_var.set("Компиляция не выполняется")
+    
+    def clear_results(self):
+        self.tokens_view.clear()
+        for view in self.table_views.values():
+            view.clear()
+        self.ast_view.clear()
+        self.log_text.delete(1.0, "end")
+        self.stats_text.delete(1.0, "end")
+    
+    def compile_job(self, source, cancel, post):
+        """Лексический, синтаксический и семантический анализ (в потоке
+        CompileWorker). Виджеты не трогает: тексты вкладок готовятся
+        здесь и передаются окну через post"""
+        stats = CompileStats()
         try:
-            self.status_var.set("Выполняется лексический анализ...")
-            self.log("=== Начало компиляции ===")
-            self.log("Шаг 1: Лексический анализ")
-            
-            lexer = Lexer(source)
-            tokens = lexer.tokenize()
-            
-            # Выводим токены в формате (таблица, номер)
-            self.tokens_text.insert("end", f"Найдено токенов: {len(tokens)}\n\n")
-            for i, token in enumerate(tokens, 1):
-                try:
-                    # Получаем ссылку на таблицу
-                    ref = lexer.token_to_table_ref(token)
-                    if ref:
-                        self.tokens_text.insert("end", f"{i:3}. ({ref[0]}, {ref[1]})\n")
-                    else:
-                        self.tokens_text.insert("end", f"{i:3}. {token}\n")
-                except Exception as e:
-                    self.tokens_text.insert("end", f"{i:3}. Ошибка: {str(e)}\n")
+            post("status", "Выполняется лексический анализ...")
+            post("log", "Шаг 1: Лексический анализ")
             
-            # Заполняем таблицы
-            # Таблица 1: Ключевые слова
-            kw_text = self.table_texts[1]
-            kw_text.insert("end", "Таблица 1: Ключевые слова\n")
-            kw_text.insert("end", "=" * 40 + "\n")
-            for i, keyword in enumerate(KEYWORDS, 1):
-                kw_text.insert("end", f"{i:3}. {keyword}\n")
+            with stats.phase("lex"):
+                lexer, tokens = self.lex(source, cancel)
+            stats.count_tokens(tokens, lexer.tables)
+            post("tokens", self.token_rows(tokens))
+            check_cancel(cancel)
+            post("tables", self.table_rows(lexer))
+            check_cancel(cancel)
             
-            # Таблица 2: Разделители
-            delim_text = self.table_texts[2]
-            delim_text.insert("end", "Таблица 2: Разделители\n")
-            delim_text.insert("end", "=" * 40 + "\n")
-            for i, delim in enumerate(DELIMITER_TABLE, 1):
-                # Пропускаем пробел, если он есть в таблице
-                if delim != " ":
-                    delim_text.insert("end", f"{i:3}. {delim}\n")
-            
-            # Таблица 3: Числа (с двоичным представлением)
-            num_text = self.table_texts[3]
-            num_text.insert("end", "Таблица 3: Числа\n")
-            num_text.insert("end", "=" * 40 + "\n")
-            for i, num in enumerate(lexer.tables.get(3, []), 1):
-                binary_repr = self.number_to_binary(num)
-                num_text.insert("end", f"{i:3}. {binary_repr}\n\n")
-            
-            # Таблица 4: Идентификаторы
-            id_text = self.table_texts[4]
-            id_text.insert("end", "Таблица 4: Идентификаторы\n")
-            id_text.insert("end", "=" * 40 + "\n")
-            for i, ident in enumerate(lexer.tables.get(4, []), 1):
-                id_text.insert("end", f"{i:3}. {ident}\n")
-            
-            self.log("✓ Лексический анализ завершен успешно")
-            self.status_var.set("Выполняется синтаксический анализ...")
+            post("log", "✓ Лексический анализ завершен успешно")
+            post("status", "Выполняется синтаксический анализ...")
             
             # Синтаксический анализ
-            self.log("\nШаг 2: Синтаксический анализ")
-            parser = Parser(tokens)
-            ast = parser.parse_program()
-            
-            # Выводим AST
-            self.ast_text.insert("end", self.format_ast(ast))
-            self.log("✓ Синтаксический анализ завершен успешно")
-            self.status_var.set("Выполняется семантический анализ...")
+            post("log", "\nШаг 2: Синтаксический анализ")
+            with stats.phase("parse"):
+                ast = self.parse(tokens, cancel)
+            stats.count_tree(ast)
+            post("ast", ast)
+            post("log", "✓ Синтаксический анализ завершен успешно")
+            post("status", "Выполняется семантический анализ...")
             
             # Семантический анализ
-            self.log("\nШаг 3: Семантический анализ")
-            sema = Semantic()
-            sema.analyze(ast)
-            
-            self.log("✓ Семантический анализ завершен успешно")
+            post("log", "\nШаг 3: Семантический анализ")
+            with stats.phase("semantic"):
+                self.analyze(ast, cancel)
+            post("log", "✓ Семантический анализ завершен успешно")
+        except Cancelled:
+            # прерванный разбор мог оставить состояние наполовину
+            # обновлённым: следующая компиляция начнётся с нуля
+            self.lexer = self.tokens = self.ast = self.sema = None
+            raise
+        finally:
+            if "semantic" in stats.phases and self.sema is not None:
+                stats.count_symbols(len(self.sema.symbols.table))
+            post("stats", stats.format_table())
+    
+    def on_message(self, kind, data):
+        """Сообщение задания компиляции (в потоке окна)"""
+        if kind == "log":
+            self.log(data)
+        elif kind == "status":
+            self.status_var.set(data)
+        elif kind == "tokens":
+            self.tokens_view.show(data)
+        elif kind == "tables":
+            for i, rows in data.items():
+                self.table_views[i].show(rows)
+        elif kind == "ast":
+            self.ast_view.show(data)
+        elif kind == "stats":
+            self.stats_text.insert("end", data)
+        elif kind == "done":
             self.log("\n=== Компиляция успешно завершена! ===")
             self.status_var.set("Компиляция завершена успешно")
-            
-        except Exception as e:
-            error_msg = str(e)
+        elif kind == "cancelled":
+            self.log("\n=== Компиляция отменена ===")
+            self.status_var.set("Компиляция отменена")
+        elif kind == "error":
+            error_msg = str(data)
             self.log(f"\n✗ ОШИБКА: {error_msg}")
             self.log("=== Компиляция прервана ===")
             self.status_var.set("Ошибка компиляции")
             messagebox.showerror("Ошибка компиляции", error_msg)
     
-    def format_ast(self, node, depth=0):
-        """Форматирует AST для отображения"""
-        result = ""
-        indent = "  " * depth
-        
-        # Информация о узле
-        node_info = f"{indent}{node.kind}"
-        if node.value is not None:
-            node_info += f": {node.value}"
-        if hasattr(node, 'pos') and node.pos:
-            node_info += f" [строка {node.pos[0]}, столбец {node.pos[1]}]"
-        
-        result += node_info + "\n"
-        
-        # Рекурсивно обрабатываем детей
-        if hasattr(node, 'children'):
-            for child in node.children:
-                if child is not None:
-                    if hasattr(child, 'kind'):  # Это узел AST
-                        result += self.format_ast(child, depth + 1)
-                    elif isinstance(child, list):
-                        for item in child:
-                            if item is not None and hasattr(item, 'kind'):
-                                result += self.format_ast(item, depth + 1)
-        
-        return result
+    def token_rows(self, tokens):
+        # Токены в формате (таблица, номер); строки строятся при показе
+        # из копии буфера (следующая компиляция меняет буфер на месте)
+        rows = Rows().lines([f"Найдено токенов: {len(tokens)}\n", "\n"])
+        if isinstance(tokens, TokenBuffer):
+            return rows.add(len(tokens), partial(self.token_row, tokens.snapshot()))
+        return rows.lines([f"{i:3}. {token}\n" for i, token in enumerate(tokens, 1)])
 
+    @staticmethod
+    def token_row(tokens, i):
+        table, ref = tokens.table_ref(i)
+        return f"{i + 1:3}. ({table}, {ref})\n"
+    
+    def table_rows(self, lexer):
+        # Строки вкладок таблиц: номер таблицы -> Rows
+        header = "=" * 40 + "\n"
+        # Таблица 1: Ключевые слова
+        kw = ["Таблица 1: Ключевые слова\n", header]
+        kw += [f"{i:3}. {keyword}\n" for i, keyword in enumerate(KEYWORDS, 1)]
+        # Таблица 2: Разделители (пробел не показывается)
+        delim = ["Таблица 2: Разделители\n", header]
+        delim += [f"{i:3}. {d}\n" for i, d in enumerate(DELIMITER_TABLE, 1) if d != " "]
+        # Таблица 3: Числа (с двоичным представлением)
+        binaries = binary_texts(lexer.tables[3].records)
+        num = Rows().lines(["Таблица 3: Числа\n", header])
+        num.add(len(binaries), lambda i: f"{i + 1:3}. {binaries[i]}\n\n")
+        # Таблица 4: Идентификаторы
+        idents = list(lexer.tables.get(4, []))
+        ids = Rows().lines(["Таблица 4: Идентификаторы\n", header])
+        ids.add(len(idents), lambda i: f"{i + 1:3}. {idents[i]}\n")
+        return {1: Rows().lines(kw), 2: Rows().lines(delim), 3: num, 4: ids}
+    
+    def lex(self, source, cancel=None):
+        """Токенизирует source; после правки пересканирует только изменённую область"""
+        try:
+            if self.tokens is not None:
+                self.lexer.cancel = cancel
+                self.tokens = self.lexer.update(self.tokens, source)
+                self.damage = self.lexer.damage
+            else:
+                self.lexer = Lexer(source, cancel=cancel)
+                self.tokens = self.lexer.tokenize()
+                self.damage = None
+        except Exception:
+            self.lexer = self.tokens = self.ast = self.sema = None
+            raise
+        return self.lexer, self.tokens
+    
+    def parse(self, tokens, cancel=None):
+        """Синтаксический анализ; после правки разбираются только задетые операторы"""
+        parser = Parser(tokens, cancel=cancel)
+        try:
+            if self.ast is not None and self.damage is not None:
+                self.ast = parser.reparse(self.ast, self.damage)
+            else:
+                self.ast = parser.parse_program()
+        except Exception:
+            self.ast = None
+            raise
+        return self.ast
+    
+    def analyze(self, ast, cancel=None):
+        """Семантический анализ; операторы без изменений повторно не проверяются"""
+        sema = Semantic(cancel=cancel)
+        try:
+            sema.analyze(ast, previous=self.sema)
+        finally:
+            self.sema = sema
+    
 def main():
     try:
         root = tk.Tk()
@@ -1,17 +1,30 @@
 ﻿import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
-from lexer import Lexer
+from functools import partial
+
+from lexer import Lexer, TokenBuffer
 from parser import Parser
 from semantic import Semantic
+from diagnostics import Cancelled
+from worker import CompileWorker, check_cancel
+from views import Rows, RowView, AstView
 
 class CompilerGUI(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Учебный компилятор")
         self.geometry("1200x700")
+        # Результаты прошлой компиляции (для инкрементального разбора)
+        self.lexer = None
+        self.tokens = None
+        self.damage = None
+        self.ast = None
+        self.sema = None
 
         self.create_widgets()
+        # Фоновая компиляция (сообщения забираются через after)
+        self.worker = CompileWorker(self, self.on_message)
 
     def create_widgets(self):
         # ---------- Верхняя панель ----------
@@ -20,6 +33,8 @@ class CompilerGUI(tk.Tk):
 
         tk.Button(top, text="Открыть файл", command=self.load_file).pack(side=tk.LEFT, padx=5)
         tk.Button(top, text="Компилировать", command=self.compile).pack(side=tk.LEFT, padx=5)
+        tk.Button(top, text="Отменить", command=self.cancel).pack(side=tk.LEFT, padx=5)
+        tk.Button(top, text="Сохранить AST", command=self.save_ast).pack(side=tk.LEFT, padx=5)
 
         # ---------- Вкладки ----------
         self.tabs = ttk.Notebook(self)
@@ -28,17 +43,32 @@ class CompilerGUI(tk.Tk):
         self.src_tab = self.make_text_tab("Исходный код")
         self.token_tab = self.make_text_tab("Токены")
         self.tables_tab = self.make_text_tab("Таблицы лексем")
-        self.ast_tab = self.make_text_tab("AST")
+        self.ast_tab = self.make_ast_tab("AST")
         self.log_tab = self.make_text_tab("Лог компиляции")
 
     def make_text_tab(self, title):
         frame = ttk.Frame(self.tabs)
         self.tabs.add(frame, text=title)
 
-        text = tk.Text(frame, wrap=tk.NONE)
+        scroll = tk.Scrollbar(frame, orient=tk.VERTICAL)
+        text = tk.Text(frame, wrap=tk.NONE, yscrollcommand=scroll.set)
+        scroll.configure(command=text.yview)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
         text.pack(fill=tk.BOTH, expand=True)
 
         frame.text = text
+        frame.view = RowView(text, scroll)
+        return frame
+
+    def make_ast_tab(self, title):
+        # Дерево AST; двойной щелчок по узлу — к месту в исходном коде
+        frame = ttk.Frame(self.tabs)
+        self.tabs.add(frame, text=title)
+
+        view = AstView(frame, self.src_tab.text)
+        view.frame.pack(fill=tk.BOTH, expand=True)
+
+        frame.view = view
         return frame
 
     # ---------- Загрузка файла ----------
@@ -52,46 +82,129 @@ class CompilerGUI(tk.Tk):
             self.src_tab.text.delete(1.0, tk.END)
             self.src_tab.text.insert(tk.END, f.read())
 
+    def save_ast(self):
+        if self.ast_tab.view.root is None:
+            messagebox.showwarning("AST", "Сначала скомпилируйте программу")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            # дерево пишется в файл по узлу, без общей строки
+            with open(path, "w", encoding="utf-8") as f:
+                self.ast_tab.view.export(f)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить AST: {e}")
+            return
+        self.log(f"AST сохранено в {path}")
+
     # ---------- Компиляция ----------
     def compile(self):
+        # Компиляция идёт в фоновом потоке; незаконченная предыдущая
+        # отменяется, и в окне появится только результат последней
         self.clear_tabs()
         source = self.src_tab.text.get(1.0, tk.END)
+        self.worker.submit(partial(self.compile_job, source))
 
-        try:
-            self.log("Лексический анализ...")
-            lexer = Lexer(source)
-            tokens = lexer.tokenize()
-
-            self.show_tokens(tokens)
-            self.show_tables(lexer.tables)
+    def cancel(self):
+        if not self.worker.cancel():
+            self.log("Компиляция не выполняется")
 
-            self.log("Лексический анализ завершён")
-
-            self.log("Синтаксический анализ...")
-            parser = Parser(tokens)
-            ast = parser.parse_program()
-            self.ast_tab.text.insert(tk.END, repr(ast))
-            self.log("Синтаксический анализ завершён")
-
-            self.log("Семантический анализ...")
-            sema = Semantic()
-            sema.analyze(ast)
-            self.log("Семантический анализ завершён")
+    def compile_job(self, source, cancel, post):
+        # Выполняется в потоке CompileWorker: виджеты не трогает, готовые
+        # тексты вкладок передаёт окну через post
+        try:
+            post("log", "Лексический анализ...")
+            lexer, tokens = self.lex(source, cancel)
+            post("tokens", self.token_rows(tokens))
+            check_cancel(cancel)
+            post("tables", self.table_rows(lexer.tables))
+            post("log", "Лексический анализ завершён")
+
+            post("log", "Синтаксический анализ...")
+            ast = self.parse(tokens, cancel)
+            post("ast", ast)
+            post("log", "Синтаксический анализ завершён")
+
+            post("log", "Семантический анализ...")
+            self.analyze(ast, cancel)
+            post("log", "Семантический анализ завершён")
+        except Cancelled:
+            # состояние инкрементального разбора могло остаться
+            # наполовину обновлённым
+            self.lexer = self.tokens = self.ast = self.sema = None
+            raise
+
+    def on_message(self, kind, data):
+        # Сообщения задания компиляции (в потоке окна)
+        if kind == "log":
+            self.log(data)
+        elif kind == "tokens":
+            self.token_tab.view.show(data)
+        elif kind == "tables":
+            self.tables_tab.view.show(data)
+        elif kind == "ast":
+            self.ast_tab.view.show(data)
+        elif kind == "done":
             self.log("\nПрограмма корректна")
-
-        except Exception as e:
+        elif kind == "cancelled":
+            self.log("\nКомпиляция отменена")
+        elif kind == "error":
             self.log("\n❌ Ошибка:")
-            self.log(str(e))
-            messagebox.showerror("Ошибка компиляции", str(e))
+            self.log(str(data))
+            messagebox.showerror("Ошибка компиляции", str(data))
 
-    # ---------- Вывод ----------
-    def show_tokens(self, tokens):
-        t = self.token_tab.text
-        for tok in tokens:
-            t.insert(tk.END, f"{tok}\n")
+    def lex(self, source, cancel=None):
+        # После правки пересканируется только изменённая область
+        try:
+            if self.tokens is not None:
+                self.lexer.cancel = cancel
+                self.tokens = self.lexer.update(self.tokens, source)
+                self.damage = self.lexer.damage
+            else:
+                self.lexer = Lexer(source, cancel=cancel)
+                self.tokens = self.lexer.tokenize()
+                self.damage = None
+        except Exception:
+            self.lexer = self.tokens = self.ast = self.sema = None
+            raise
+        return self.lexer, self.tokens
+
+    def parse(self, tokens, cancel=None):
+        # После правки заново разбираются только задетые операторы
+        parser = Parser(tokens, cancel=cancel)
+        try:
+            if self.ast is not None and self.damage is not None:
+                self.ast = parser.reparse(self.ast, self.damage)
+            else:
+                self.ast = parser.parse_program()
+        except Exception:
+            self.ast = None
+            raise
+        return self.ast
+
+    def analyze(self, ast, cancel=None):
+        # Операторы без изменений повторно не проверяются
+        sema = Semantic(cancel=cancel)
+        try:
+            sema.analyze(ast, previous=self.sema)
+        finally:
+            self.sema = sema
 
-    def show_tables(self, tables):
-        t = self.tables_tab.text
+    # ---------- Вывод ----------
+    def token_rows(self, tokens):
+        # Строки строятся при показе из копии буфера (следующая компиляция
+        # меняет буфер на месте)
+        if isinstance(tokens, TokenBuffer):
+            tokens = tokens.snapshot()
+            return Rows().add(len(tokens), lambda i: f"{tokens[i]}\n")
+        return Rows().lines([f"{tok}\n" for tok in tokens])
+
+    def table_rows(self, tables):
+        rows = Rows()
         names = {
             1: "Ключевые слова",
             2: "Разделители",
@@ -100,16 +213,17 @@ class CompilerGUI(tk.Tk):
         }
 
         for k in range(1, 5):
-            t.insert(tk.END, f"\n=== {names[k]} ===\n")
-            for i, val in enumerate(tables[k], start=1):
-                t.insert(tk.END, f"{i}: {val}\n")
+            values = list(tables[k])
+            rows.lines([f"\n=== {names[k]} ===\n"])
+            rows.add(len(values), lambda i, values=values: f"{i + 1}: {values[i]}\n")
+        return rows
 
     def log(self, msg):
         self.log_tab.text.insert(tk.END, msg + "\n")
 
     def clear_tabs(self):
         for tab in [self.token_tab, self.tables_tab, self.ast_tab, self.log_tab]:
-            tab.text.delete(1.0, tk.END)
+            tab.view.clear()
 
 # ---------- Запуск ----------
 if __name__ == "__main__":
@@ -1,3 +1,16 @@
+import io
+import os
+import re
+import sys
+import mmap
+import stat
+import codecs
+from array import array
+from bisect import bisect_left, bisect_right
+from enum import IntEnum
+from literals import Literal
+from diagnostics import CompileError, Cancelled
+
 KEYWORDS = [
    "program", "var", "begin", "end", "dim", "let", "if", "then", "else", "end_else", "for", "do",
    "while", "loop", "input", "output", "%", "!", "$", "true", "false"
@@ -8,12 +21,256 @@ DELIMITER_TABLE = [
    "plus", "min", "or", "mult", "div", "and"
 ]
 
+# Номера лексем в постоянных таблицах (нумерация с 1)
+KEYWORD_INDEX = {word: i for i, word in enumerate(KEYWORDS, 1)}
+DELIMITER_INDEX = {delim: i for i, delim in enumerate(DELIMITER_TABLE, 1)}
+
+WORD_OPERATORS = ("ne", "eq", "lt", "le", "gt", "ge", "plus", "min", "or", "mult", "div", "and")
+
+# -------------------------------------------------
+# Регулярные выражения для быстрого движка
+# -------------------------------------------------
+
+# Хвост числа после целой части/экспоненты: HEX (буквы a-f и суффикс H)
+# либо вещественная часть с необязательной экспонентой.
+_NUMBER_TAIL = r"""
+    (?: [a-fA-F]+[Hh]
+      | (?![a-fA-F])
+        (?: \.[0-9]+(?![0-9]) (?: [Ee][+-]?[0-9]+(?![0-9]) | (?![Ee]) )
+          | (?!\.) )
+    )
+"""
+
+# Повторяет дерево решений Lexer.number(): любой неверный вариант не
+# совпадает вовсе, и тогда число разбирается посимвольно (ради текста ошибки).
+_NUMBER = r"""
+    [0-9]+(?![0-9])
+    (?: [BbOoDd]
+      | [Ee][a-fA-F]+[Hh]
+      | [Ee][+-]?[0-9]+(?![0-9]) """ + _NUMBER_TAIL + r"""
+      | (?![BbOoDdEe]) """ + _NUMBER_TAIL + r"""
+    )
+"""
+
+_TOKEN_RE = re.compile(r"""
+      (?P<ws>\s+)
+    | (?P<comment>\{\*)
+    | (?P<word>[A-Za-z_]\w*)
+    | (?P<number>""" + _NUMBER + r""")
+    | (?P<op>[.;,{}=()~])
+    | (?P<kw>[%!$])
+""", re.VERBOSE)
+
+_WORD_OPERATOR_SET = frozenset(WORD_OPERATORS)
+
+ENGINES = ("char", "regex")
+
+# Размер блока (в байтах) при чтении файла (через mmap или read)
+CHUNK_SIZE = 1 << 20
+
+# Через сколько символов быстрый движок проверяет Lexer.cancel
+CANCEL_STEP = 1 << 16
+
+
+class TokenKind(IntEnum):
+    """Целочисленные коды видов токенов.
+
+    Коды ключевых слов совпадают с их номерами в таблице KEYWORDS.
+    """
+    KW_PROGRAM = 1
+    KW_VAR = 2
+    KW_BEGIN = 3
+    KW_END = 4
+    KW_DIM = 5
+    KW_LET = 6
+    KW_IF = 7
+    KW_THEN = 8
+    KW_ELSE = 9
+    KW_END_ELSE = 10
+    KW_FOR = 11
+    KW_DO = 12
+    KW_WHILE = 13
+    KW_LOOP = 14
+    KW_INPUT = 15
+    KW_OUTPUT = 16
+    KW_INT = 17     # %
+    KW_REAL = 18    # !
+    KW_BOOL = 19    # $
+    KW_TRUE = 20
+    KW_FALSE = 21
+    OP = 22
+    NUMBER = 23
+    ID = 24
+
+
+# Строковые имена видов ("KW_END_ELSE", "KW_%", "OP", ...) по коду и обратно
+KIND_NAMES = [None] + ["KW_" + word.upper() for word in KEYWORDS] + ["OP", "NUMBER", "ID"]
+KIND_CODES = {name: code for code, name in enumerate(KIND_NAMES) if name}
+
+# Номер таблицы лексем по коду вида
+KIND_TABLE = [0] + [1] * len(KEYWORDS) + [2, 3, 4]
+
+
+class LineIndex:
+    """Смещения начал строк исходного текста.
+
+    Лексер хранит только смещения символов; строка и столбец вычисляются
+    двоичным поиском, когда они действительно нужны.
+    """
+
+    def __init__(self, text=""):
+        self.starts = array('q', [0])
+        self.size = 0
+        self.extend(text)
+
+    def extend(self, text):
+        # Добавляет следующий кусок текста (для чтения файла блоками)
+        starts = self.starts
+        base = self.size
+        find = text.find
+        i = find('\n')
+        while i >= 0:
+            starts.append(base + i + 1)
+            i = find('\n', i + 1)
+        self.size += len(text)
+
+    def position(self, offset):
+        # (строка, столбец) по смещению, нумерация с 1
+        line = bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1] + 1
+
+    def apply_edit(self, offset, deleted, inserted):
+        # Замена deleted символов с offset на inserted (на месте: индекс общий
+        # у токенов и узлов AST). Строки до правки не пересчитываются,
+        # после — только сдвигаются
+        starts = self.starts
+        lo = bisect_right(starts, offset)
+        hi = bisect_right(starts, offset + deleted, lo)
+        delta = len(inserted) - deleted
+        new = starts[:lo]
+        i = inserted.find('\n')
+        while i >= 0:
+            new.append(offset + i + 1)
+            i = inserted.find('\n', i + 1)
+        new.extend(s + delta for s in starts[hi:])
+        self.starts = new
+        self.size += delta
+
+    def copy(self):
+        index = LineIndex()
+        index.starts = array('q', self.starts)
+        index.size = self.size
+        return index
+
+
+def diff_edit(old, new):
+    # Одна правка (смещение, сколько удалено, что вставлено), переводящая
+    # old в new: общие начало и конец ищутся двоичным поиском по срезам
+    n = min(len(old), len(new))
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = lo
+    lo, hi = 0, n - prefix
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    suffix = lo
+    return prefix, len(old) - prefix - suffix, new[prefix:len(new) - suffix]
+
+
+def read_blocks(f, chunk_size=CHUNK_SIZE):
+    # Блоки байтов двоичного файла f парами (блок, последний ли). Обычный
+    # файл отображается в память; канал, FIFO, /dev/stdin и файловые
+    # объекты без fileno (BytesIO) читаются через read — у них st_size 0
+    try:
+        st = os.fstat(f.fileno())
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        st = None
+    mm = None
+    if st is not None and stat.S_ISREG(st.st_mode) and st.st_size > 0:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            pass
+    if mm is not None:
+        with mm:
+            size = len(mm)
+            for start in range(0, size, chunk_size):
+                yield mm[start:start + chunk_size], start + chunk_size >= size
+        return
+    # конец потока виден только по пустому read: блок отдаётся, когда
+    # прочитан следующий
+    block = f.read(chunk_size)
+    while block:
+        following = f.read(chunk_size)
+        yield block, not following
+        block = following
+
+
 class Token:
-    def __init__(self, kind, value, line, col):
+    def __init__(self, kind, value, offset, lines):
         self.kind = kind
         self.value = value
-        self.line = line
-        self.col = col
+        self.offset = offset
+        self.lines = lines
+
+    @property
+    def line(self):
+        return self.lines.position(self.offset)[0]
+
+    @property
+    def col(self):
+        return self.lines.position(self.offset)[1]
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.value!r}, {self.line}:{self.col})"
+    def __str__(self):
+        return f"{self.kind}, {self.value!r}, {self.line}:{self.col}"
+
+
+class TokenView:
+    """Токен из TokenBuffer с тем же интерфейсом, что у Token."""
+    __slots__ = ("buffer", "index")
+
+    def __init__(self, buffer, index):
+        self.buffer = buffer
+        self.index = index
+
+    @property
+    def code(self):
+        return self.buffer.kinds[self.index]
+
+    @property
+    def kind(self):
+        return KIND_NAMES[self.buffer.kinds[self.index]]
+
+    @property
+    def value(self):
+        return self.buffer.value(self.index)
+
+    @property
+    def offset(self):
+        return self.buffer.offsets[self.index]
+
+    @property
+    def line(self):
+        return self.buffer.position(self.index)[0]
+
+    @property
+    def col(self):
+        return self.buffer.position(self.index)[1]
+
+    @property
+    def ref(self):
+        return self.buffer.table_ref(self.index)
 
     def __repr__(self):
         return f"Token({self.kind}, {self.value!r}, {self.line}:{self.col})"
@@ -21,18 +278,180 @@ class Token:
         return f"{self.kind}, {self.value!r}, {self.line}:{self.col}"
 
 
+class TokenBuffer:
+    """Поток токенов в виде параллельных массивов.
+
+    Для каждого токена хранятся код вида, номер в таблице лексем, номер
+    интернированного значения и смещение в тексте; строка и столбец
+    берутся из общего LineIndex. buffer[i] возвращает TokenView, поэтому
+    буфер можно использовать вместо списка Token. numbers — таблица 3,
+    к которой относятся номера чисел: из неё парсер берёт уже разобранные
+    литералы (literal).
+    """
+
+    def __init__(self, lines=None, numbers=None):
+        self.kinds = array('i')
+        self.refs = array('i')
+        self.values = array('i')
+        self.offsets = array('q')
+        self.strings = LexemeTable()  # интернированные значения токенов
+        self.lines = lines if lines is not None else LineIndex()
+        self.numbers = numbers
+
+    @classmethod
+    def from_tokens(cls, tokens, lexer=None):
+        # Буфер из списка Token; номера лексем регистрируются в lexer
+        lexer = lexer or Lexer("")
+        buf = cls(tokens[0].lines if tokens else lexer.lines, lexer.tables[3])
+        for tok in tokens:
+            buf.append_token(tok, lexer)
+        return buf
+
+    def append(self, kind, value, ref, offset):
+        self.kinds.append(kind)
+        self.refs.append(ref)
+        self.values.append(self.strings.intern(value))
+        self.offsets.append(offset)
+
+    def append_token(self, tok, lexer):
+        ref = lexer.token_to_table_ref(tok)[1]
+        self.append(KIND_CODES[tok.kind], tok.value, ref, tok.offset)
+
+    def position(self, i):
+        # (строка, столбец) i-го токена
+        return self.lines.position(self.offsets[i])
+
+    def value(self, i):
+        return self.strings.values[self.values[i] - 1]
+
+    def table_ref(self, i):
+        return KIND_TABLE[self.kinds[i]], self.refs[i]
+
+    def literal(self, i):
+        # Разобранный литерал i-го токена (числа): запись таблицы 3
+        if self.numbers is None:
+            return Literal(self.value(i))
+        return self.numbers.record(self.refs[i])
+
+    def snapshot(self):
+        # Копия, которую не изменят следующие relex и renumber (её читает
+        # другой поток). strings общие: в них значения только добавляются
+        buf = TokenBuffer(self.lines.copy(), self.numbers)
+        buf.kinds = array('i', self.kinds)
+        buf.refs = array('i', self.refs)
+        buf.values = array('i', self.values)
+        buf.offsets = array('q', self.offsets)
+        buf.strings = self.strings
+        return buf
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, i):
+        n = len(self.kinds)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("list index out of range")
+        return TokenView(self, i)
+
+    def __iter__(self):
+        for i in range(len(self.kinds)):
+            yield TokenView(self, i)
+
+    def __repr__(self):
+        return "[" + ", ".join(repr(tok) for tok in self) + "]"
+
+
+class LexemeTable:
+    """Таблица лексем: упорядоченный список значений и словарь значение -> номер.
+
+    Итерация, len() и индексация с нуля работают как у списка, номера
+    лексем (для пар (таблица, номер)) начинаются с 1.
+    """
+
+    def __init__(self, values=()):
+        self.values = []
+        self.index = {}
+        for value in values:
+            self.intern(value)
+
+    def intern(self, value):
+        # Номер лексемы; новая лексема добавляется в конец таблицы
+        idx = self.index.get(value)
+        if idx is None:
+            self.values.append(value)
+            idx = self.index[value] = len(self.values)
+        return idx
+
+    def lookup(self, idx):
+        # Обратный поиск: лексема по номеру (с 1)
+        return self.values[idx - 1]
+
+    def __contains__(self, value):
+        return value in self.index
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return repr(self.values)
+
+
+class NumberTable(LexemeTable):
+    """Таблица 3: вместе с лексемой хранится её разобранный литерал
+    (literals.Literal) — records[i] для values[i]."""
+
+    def __init__(self, values=()):
+        self.records = []
+        if isinstance(values, NumberTable):
+            # копия без повторного разбора
+            self.values = list(values.values)
+            self.index = dict(values.index)
+            self.records = list(values.records)
+            return
+        super().__init__(values)
+
+    def intern(self, value, record=None):
+        # record — уже разобранный литерал value, если он есть (при
+        # перенумерации); иначе литерал разбирается здесь, один раз
+        idx = self.index.get(value)
+        if idx is None:
+            self.values.append(value)
+            self.records.append(record if record is not None else Literal(value))
+            idx = self.index[value] = len(self.values)
+        return idx
+
+    def record(self, idx):
+        # Литерал по номеру (с 1)
+        return self.records[idx - 1]
+
+
 class Lexer:
-    def __init__(self, text):
+    def __init__(self, text, engine="regex", cancel=None):
+        if engine not in ENGINES:
+            raise ValueError(f"неизвестный движок лексера '{engine}'")
         self.text = text
+        self.engine = engine
+        # threading.Event: когда он установлен, разбор прекращается
+        # исключением Cancelled (быстрый движок проверяет его каждые
+        # CANCEL_STEP символов)
+        self.cancel = cancel
         self.pos = 0
-        self.line = 1
-        self.col = 1
+        self.base = 0  # смещение self.text от начала исходника (при чтении блоками)
+        self.lines = LineIndex(text)
         # таблицы лексем
         self.tables = {
-            1: [],  # ключевые слова
-            2: [],  # разделители
-            3: [],  # числа
-            4: []   # идентификаторы
+            1: LexemeTable(),  # ключевые слова
+            2: LexemeTable(),  # разделители
+            3: NumberTable(),  # числа
+            4: LexemeTable()   # идентификаторы
         }
 
     # -------------------------------------------------
@@ -50,29 +469,40 @@ class Lexer:
     def advance(self):
         ch = self.current()
         self.pos += 1
-        if ch == '\n':
-            self.line += 1
-            self.col = 1
-        else:
-            self.col += 1
         return ch
 
+    def position(self, pos=None):
+        # (строка, столбец) позиции pos текущего текста (по умолчанию self.pos)
+        return self.lines.position(self.base + (self.pos if pos is None else pos))
+
+    @property
+    def line(self):
+        return self.position()[0]
+
+    @property
+    def col(self):
+        return self.position()[1]
+
+    def is_hex_letter(self):
+        ch = self.current()
+        return ch != '' and ch.lower() in 'abcdef'
+
+    def make_token(self, kind, value, start):
+        return Token(kind, value, self.base + start, self.lines)
+
     def register_lexeme(self, table_no, value):
-        table = self.tables[table_no]
-        if value not in table:
-            table.append(value)
-        index = table.index(value) + 1  # нумерация с 1
-        return table_no, index
+        return table_no, self.tables[table_no].intern(value)  # нумерация с 1
 
     def token_to_table_ref(self, token):                                                                             
+        # Для токенов из TokenBuffer номер уже известен
+        if isinstance(token, TokenView):
+            return token.ref
         # Для ключевых слов
         if token.kind.startswith("KW_"):
-            idx = KEYWORDS.index(token.value.lower()) + 1                          
-            return (1, idx)
+            return (1, KEYWORD_INDEX[token.value.lower()])
         # Для операторов и разделителей
         if token.kind in ("OP", "NEWLINE"):                                                   
-            idx = DELIMITER_TABLE.index(token.value.lower()) + 1                                             
-            return (2, idx)
+            return (2, DELIMITER_INDEX[token.value.lower()])
         # Для чисел
         if token.kind == "NUMBER":
             return self.register_lexeme(3, token.value)
@@ -90,23 +520,24 @@ class Lexer:
             self.advance()
 
     def skip_comment(self):
-        # текущий символ '{', следующий '*'
-        self.advance()  # пропускаем '{'
-        self.advance()  # пропускаем '*'
-    
-        while self.current():
-            if self.current() == '*' and self.peek(2) == "*}":       
-                self.advance()
-                self.advance()
-                return
-            self.advance()
-        raise Exception(f"Лексическая ошибка на {self.line}:{self.col}: незакрытый комментарий")
+        # текущий символ '{', следующий '*'; конец ищем поиском подстроки
+        end = self.text.find("*}", self.pos + 2)
+        if end >= 0:
+            self.pos = end + 2
+            return
+        self.unclosed_comment()
+
+    def unclosed_comment(self):
+        # Комментарий не закрыт до конца текста: ошибка в конце текста
+        self.pos = len(self.text)
+        raise CompileError(f"Лексическая ошибка на {self.line}:{self.col}: незакрытый комментарий",
+                           "lexical", (self.line, self.col))
     # -------------------------------------------------
     # Идентификаторы и ключевые слова
     # -------------------------------------------------
 
     def identifier_or_keyword(self):
-        start_line, start_col = self.line, self.col
+        start = self.pos
         value = ""
         # Собираем буквенно-цифровые символы
         while self.current().isalnum() or self.current() == '_':
@@ -114,24 +545,26 @@ class Lexer:
         low = value.lower()
         # Проверяем ключевые слова
         if low in KEYWORDS:
-            return Token("KW_" + low.upper(), value, start_line, start_col)
+            return self.make_token("KW_" + low.upper(), value, start)
         # Проверяем операторы-слова
-        if low in ("ne", "eq", "lt", "le", "gt", "ge", "plus", "min", "or", "mult", "div", "and"):
-            return Token("OP", low, start_line, start_col)
-        return Token("ID", value, start_line, start_col)
+        if low in WORD_OPERATORS:
+            return self.make_token("OP", low, start)
+        return self.make_token("ID", value, start)
 
     # -------------------------------------------------
     # Числа (ВСЕ ВИДЫ)
     # -------------------------------------------------
 
     def number(self):
-        start_line, start_col = self.line, self.col
+        start = self.pos
         value = ""
 
         def error():
-            raise Exception(
+            start_line, start_col = self.position(start)
+            raise CompileError(
                 f"Лексическая ошибка на {start_line}:{start_col}: "
-                f"неправильный формат числа '{value}'"
+                f"неправильный формат числа '{value}'",
+                "lexical", (start_line, start_col)
             )
 
         # ---------- целая часть (обязательная) ----------
@@ -148,19 +581,19 @@ class Lexer:
             if any(c not in '01' for c in int_part):
                 error()
             value += self.advance()
-            return Token("NUMBER", value, start_line, start_col)
+            return self.make_token("NUMBER", value, start)
 
         # OCT
         if self.current() in ('O', 'o'):
             if any(c not in '01234567' for c in int_part):
                 error()
             value += self.advance()
-            return Token("NUMBER", value, start_line, start_col)
+            return self.make_token("NUMBER", value, start)
 
         # DEC с суффиксом
         if self.current() in ('D', 'd'):
             value += self.advance()
-            return Token("NUMBER", value, start_line, start_col)
+            return self.make_token("NUMBER", value, start)
 
         # ---------- экспонента ----------
         if self.current() in ('E', 'e'):
@@ -168,14 +601,14 @@ class Lexer:
             if self.current() in ('+', '-'):
                 value += self.advance()
             # ---------- HEX ----------
-            elif self.current().lower() in 'abcdef':
+            elif self.is_hex_letter():
                 hex_tail = ""
-                while self.current().lower() in 'abcdef':
+                while self.is_hex_letter():
                     hex_tail += self.advance()
                 if hex_tail:
                     if self.current() in ('H', 'h'):
                         value += hex_tail + self.advance()
-                        return Token("NUMBER", value, start_line, start_col)
+                        return self.make_token("NUMBER", value, start)
                     else:
                         error()
             exp = ""
@@ -187,12 +620,12 @@ class Lexer:
         
         # ---------- HEX ----------
         hex_tail = ""
-        while self.current().lower() in 'abcdef':
+        while self.is_hex_letter():
             hex_tail += self.advance()
         if hex_tail:
             if self.current() in ('H', 'h'):
                 value += hex_tail + self.advance()
-                return Token("NUMBER", value, start_line, start_col)
+                return self.make_token("NUMBER", value, start)
             else:
                 error()
 
@@ -217,7 +650,7 @@ class Lexer:
                     error()
                 value += exp
 
-        return Token("NUMBER", value, start_line, start_col)
+        return self.make_token("NUMBER", value, start)
 
 
     # -------------------------------------------------
@@ -225,37 +658,54 @@ class Lexer:
     # -------------------------------------------------
 
     def operator(self):
-        start_line, start_col = self.line, self.col
+        start = self.pos
         # Проверяем двухсимвольные операторы
         two_char = self.peek(2).lower()
         if two_char in ("ne", "eq", "lt", "le", "gt", "ge", "or"):
             for _ in two_char:
                 self.advance()
-            return Token("OP", two_char, start_line, start_col)
+            return self.make_token("OP", two_char, start)
         # Проверяем многосимвольные операторы-слова
         for word in ("plus", "min", "mult", "div", "and"):
             if self.peek(len(word)).lower() == word:
                 for _ in word:
                     self.advance()
-                return Token("OP", word, start_line, start_col)
+                return self.make_token("OP", word, start)
         # Одиночные символы-разделители
         ch = self.current()
         if ch in (".", ";", ",", "{", "}", "=", "(", ")", " ", "~"):
             self.advance()
-            return Token("OP", ch, start_line, start_col)
+            return self.make_token("OP", ch, start)
         if ch in KEYWORDS:
             self.advance()
-            return Token("KW_" + ch.upper(), ch, start_line, start_col)
-        raise Exception(f"Лексическая ошибка на {start_line}:{start_col}"
-                            f" неизвестный оператор '{ch}'")
+            return self.make_token("KW_" + ch.upper(), ch, start)
+        start_line, start_col = self.position(start)
+        raise CompileError(f"Лексическая ошибка на {start_line}:{start_col}"
+                            f" неизвестный оператор '{ch}'", "lexical", (start_line, start_col))
 
     # -------------------------------------------------
     # Главный метод
     # -------------------------------------------------
     
 
-    def tokenize(self):
-        tokens = []
+    def tokenize(self, sink=None):
+        # sink — куда вывести пары (таблица, номер): см. make_sink
+        if self.engine == "regex":
+            tokens = self.tokenize_regex()
+        else:
+            tokens = self.tokenize_char()
+        if sink is not None:
+            self.emit_refs(tokens, sink)
+        return tokens
+
+    def emit_refs(self, tokens, sink):
+        target = make_sink(sink)
+        target.emit(tokens)
+        if target is not sink:
+            target.close()
+
+    def tokenize_char(self):
+        tokens = TokenBuffer(self.lines, self.tables[3])
 
         while self.current():
             ch = self.current()
@@ -269,24 +719,367 @@ class Lexer:
                 continue
             # Идентификаторы и буквенные ключевые слова
             if ch.isalpha() or ch == '_':
-                tokens.append(self.identifier_or_keyword())
-                if tokens[-1].kind == ".":
-                    break
+                tokens.append_token(self.identifier_or_keyword(), self)
                 continue
             # Числа
             if ch.isdigit():
-                tokens.append(self.number())
+                tokens.append_token(self.number(), self)
                 continue
             # Операторы и разделители
-            tokens.append(self.operator())
-        self.print_tokens(tokens)
+            tokens.append_token(self.operator(), self)
+        return tokens
+
+    def scan_one(self):
+        # Один токен посимвольным движком (self.pos стоит на его начале)
+        ch = self.current()
+        if ch.isalpha() or ch == '_':
+            return self.identifier_or_keyword()
+        if ch.isdigit():
+            return self.number()
+        return self.operator()
+
+    def tokenize_regex(self):
+        tokens = TokenBuffer(self.lines, self.tables[3])
+        self.scan_regex(tokens)
+        return tokens
+
+    def scan_regex(self, tokens, final=True, stop_at=None):
+        # Быстрый движок: одно регулярное выражение на лексему. Всё, что оно
+        # не покрывает (не-ASCII символы, ошибочные числа, неизвестные
+        # операторы), разбирается посимвольным движком — так токены, позиции
+        # и тексты ошибок совпадают с tokenize_char.
+        # Сканирует self.text с self.pos и дописывает токены в tokens. При
+        # final=False текст — не последний блок файла: на незакрытом
+        # комментарии разбор останавливается (self.pos указывает на "{*")
+        # и метод возвращает False. Так же он останавливается перед токеном,
+        # для смещения которого stop_at(смещение) вернёт истину.
+        text = self.text
+        n = len(text)
+        match = _TOKEN_RE.match
+        numbers = self.tables[3]
+        idents = self.tables[4]
+        append = tokens.append
+        op_kind, number_kind, id_kind = TokenKind.OP.value, TokenKind.NUMBER.value, TokenKind.ID.value
+        base = self.base
+        pos = self.pos
+        cancel = self.cancel
+        check = n if cancel is None else pos + CANCEL_STEP
+
+        while pos < n:
+            if pos >= check:
+                if cancel.is_set():
+                    self.pos = pos
+                    raise Cancelled()
+                check = pos + CANCEL_STEP
+            m = match(text, pos)
+            group = m.lastgroup if m else None
+            if group == "ws":
+                pos = m.end()
+                continue
+            if group == "comment":
+                end = text.find("*}", pos + 2)
+                if end < 0:
+                    self.pos = pos
+                    if not final:
+                        return False
+                    self.skip_comment()
+                pos = end + 2
+                continue
+
+            offset = base + pos
+            if stop_at is not None and stop_at(offset):
+                self.pos = pos
+                return False
+            if group == "word":
+                value = m.group()
+                low = value.lower()
+                code = KEYWORD_INDEX.get(low)
+                if code is not None:
+                    append(code, value, code, offset)
+                elif low in _WORD_OPERATOR_SET:
+                    append(op_kind, low, DELIMITER_INDEX[low], offset)
+                else:
+                    append(id_kind, value, idents.intern(value), offset)
+                pos = m.end()
+                continue
+            if group == "number":
+                value = m.group()
+                end = m.end()
+                suffix = value[-1]
+                if not ((end < n and text[end] >= '\x80')
+                        or (suffix in 'Bb' and value[:-1].strip('01'))
+                        or (suffix in 'Oo' and value[:-1].strip('01234567'))):
+                    append(number_kind, value, numbers.intern(value), offset)
+                    pos = end
+                    continue
+            elif group == "op":
+                ch = m.group()
+                append(op_kind, ch, DELIMITER_INDEX[ch], offset)
+                pos += 1
+                continue
+            elif group == "kw":
+                ch = m.group()
+                code = KEYWORD_INDEX[ch]
+                append(code, ch, code, offset)
+                pos += 1
+                continue
+
+            # Медленный путь для одного токена
+            self.pos = pos
+            tokens.append_token(self.scan_one(), self)
+            pos = self.pos
+
+        self.pos = pos
+        return True
+
+    # -------------------------------------------------
+    # Инкрементальный разбор после правки
+    # -------------------------------------------------
+
+    def relex(self, tokens, offset, deleted, inserted):
+        # tokens — результат разбора self.text. Текст меняется правкой
+        # (offset, deleted, inserted), и заново сканируется только
+        # повреждённая область: с конца последнего токена, который правка не
+        # задела, до первого токена после правки, начало которого совпадает
+        # (со сдвигом) с началом старого токена. Отсюда сканер дал бы те же
+        # токены, что и раньше, поэтому хвост берётся из старого потока со
+        # сдвинутыми смещениями. Комментарий "{*", открытый правкой,
+        # проглатывает старые токены, и синхронизация наступает только после
+        # его конца. Заменённый диапазон токенов (начало, конец в старом
+        # потоке, конец в новом) и сдвиг смещений сохраняются в self.damage.
+        text = self.text[:offset] + inserted + self.text[offset + deleted:]
+        delta = len(inserted) - deleted
+        edit_end = offset + len(inserted)
+        offs = tokens.offsets
+        n_old = len(offs)
+
+        # Токены, кончающиеся до offset, правка не затрагивает (сканер
+        # заглядывает не дальше одного символа за конец лексемы)
+        r = bisect_left(offs, offset)
+        if r > 0 and offs[r - 1] + len(tokens.value(r - 1)) >= offset:
+            r -= 1
+        start = offs[r - 1] + len(tokens.value(r - 1)) if r > 0 else 0
+
+        def stop_at(pos):
+            if pos < edit_end:
+                return False
+            j = bisect_left(offs, pos - delta, r)
+            return j < n_old and offs[j] == pos - delta
+
+        self.text, self.pos, self.base = text, start, 0
+        self.lines.apply_edit(offset, deleted, inserted)
+        mid = TokenBuffer(self.lines, self.tables[3])
+        mid.strings = tokens.strings
+        if self.scan_regex(mid, stop_at=stop_at):
+            j = n_old
+        else:
+            j = bisect_left(offs, self.pos - delta, r)
+
+        res = TokenBuffer(self.lines, self.tables[3])
+        res.strings = tokens.strings
+        for name in ("kinds", "refs", "values"):
+            col = getattr(tokens, name)
+            setattr(res, name, col[:r] + getattr(mid, name) + col[j:])
+        res.offsets = offs[:r] + mid.offsets
+        res.offsets.extend(o + delta for o in offs[j:])
+        self.damage = (r, j, r + len(mid), delta)
+
+        # Номера в таблицах чисел и идентификаторов идут по первому
+        # появлению, как при полном разборе; если числа и идентификаторы в
+        # заменённой области те же, номера не меняются, иначе таблицы
+        # строятся заново (один проход по буферу)
+        if self.lexeme_values(tokens, r, j) != self.lexeme_values(mid, 0, len(mid)):
+            self.renumber(res)
+        return res
+
+    def update(self, tokens, text):
+        # relex для нового полного текста (правка находится сравнением)
+        return self.relex(tokens, *diff_edit(self.text, text))
+
+    @staticmethod
+    def lexeme_values(tokens, start, end):
+        kinds, values = tokens.kinds, tokens.values
+        return [(kinds[i], values[i]) for i in range(start, end)
+                if kinds[i] == TokenKind.NUMBER or kinds[i] == TokenKind.ID]
+
+    def renumber(self, tokens):
+        # Таблицы 3 и 4 и номера в них заново, в порядке токенов; литералы
+        # переходят в новую таблицу 3 без повторного разбора
+        old = self.tables[3]
+        numbers = self.tables[3] = tokens.numbers = NumberTable()
+        idents = self.tables[4] = LexemeTable()
+        strings = tokens.strings.values
+        refs, values = tokens.refs, tokens.values
+        number_kind, id_kind = TokenKind.NUMBER.value, TokenKind.ID.value
+        for i, kind in enumerate(tokens.kinds):
+            if kind == number_kind:
+                refs[i] = numbers.intern(strings[values[i] - 1], old.record(refs[i]))
+            elif kind == id_kind:
+                refs[i] = idents.intern(strings[values[i] - 1])
+
+    # -------------------------------------------------
+    # Разбор файла блоками
+    # -------------------------------------------------
+
+    def scan_file_chunks(self, source, chunk_size=CHUNK_SIZE, tokens=None):
+        # source — путь или открытый двоичный файл; он читается блоками по
+        # chunk_size байт (read_blocks) и декодируется из UTF-8 (переводы
+        # строк — как при open(..., "r")). Блок разбирается
+        # только до последнего '\n': лексемы, кроме комментариев, не содержат
+        # перевода строки, поэтому ни число, ни mult/div не режутся границей.
+        # Если блок кончился внутри комментария, запоминается только это
+        # состояние: дальше в новых блоках ищется лишь "*}", текст
+        # комментария повторно не просматривается.
+        # После каждого блока отдаёт буфер токенов: новый или общий tokens.
+        self.lines = LineIndex()
+        if tokens is not None:
+            tokens.lines = self.lines
+        if isinstance(source, (str, bytes, os.PathLike)):
+            with open(source, "rb") as f:
+                yield from self.scan_blocks(read_blocks(f, chunk_size), tokens)
+        else:
+            yield from self.scan_blocks(read_blocks(source, chunk_size), tokens)
+
+    def scan_blocks(self, blocks, tokens):
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(), translate=True)
+        carry = ""
+        comment = False     # блок кончился внутри комментария
+        for block, final in blocks:
+            piece = decoder.decode(block, final=final)
+            self.lines.extend(piece)
+            pending = carry + piece
+            if comment:
+                # carry — непросмотренный хвост, начиная с символа,
+                # который может быть '*' из "*}" на границе блоков
+                end = pending.find("*}")
+                if end < 0:
+                    if final:
+                        self.text, self.base = pending, self.lines.size - len(pending)
+                        self.unclosed_comment()
+                    carry = pending[-1:]
+                    continue
+                comment = False
+                pending = pending[end + 2:]
+            cut = len(pending) if final else pending.rfind("\n") + 1
+            if cut == 0:
+                carry = pending
+                continue
+            self.text, self.pos = pending[:cut], 0
+            self.base = self.lines.size - len(pending)
+            carry = pending[cut:]
+            buf = tokens if tokens is not None else TokenBuffer(self.lines, self.tables[3])
+            if not self.scan_regex(buf, final):
+                # "*}" в self.text после "{*" уже искали: остаётся
+                # последний символ текста и неразобранный хвост
+                comment = True
+                carry = self.text[max(self.pos + 2, len(self.text) - 1):] + carry
+            yield buf
+
+    def iter_file(self, source, chunk_size=CHUNK_SIZE):
+        # Ленивый поток токенов файла: в памяти только текущий блок
+        for buf in self.scan_file_chunks(source, chunk_size):
+            yield from buf
+
+    def tokenize_file(self, source, chunk_size=CHUNK_SIZE, sink=None, progress=None):
+        # Как tokenize, но исходный текст читается блоками из файла (путь
+        # или двоичный файловый объект, см. scan_file_chunks);
+        # progress(tokens), если задан, вызывается после каждого блока
+        tokens = TokenBuffer(numbers=self.tables[3])
+        for _ in self.scan_file_chunks(source, chunk_size, tokens):
+            if progress is not None:
+                progress(tokens)
+        if sink is not None:
+            self.emit_refs(tokens, sink)
         return tokens
     def print_tokens(self, tokens):           
-        for token in tokens:
-        #    print(str(token)) # Вывод токенов
-            ref = self.token_to_table_ref(token)
-            print(ref, end="\n")
+        StreamSink(sys.stdout).emit(tokens)
+
+
+# -------------------------------------------------
+# Приёмники потока пар (таблица, номер)
+# -------------------------------------------------
+
+class RefSink:
+    """Базовый приёмник: получает пары (таблица, номер) блоками по block_size."""
+    block_size = 8192
+
+    def emit(self, tokens):
+        kinds, refs = tokens.kinds, tokens.refs
+        for start in range(0, len(kinds), self.block_size):
+            end = start + self.block_size
+            self.write_block([(KIND_TABLE[k], r) for k, r in zip(kinds[start:end], refs[start:end])])
+        self.flush()
+
+    def write_block(self, block):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class StreamSink(RefSink):
+    """Текстовый поток (по умолчанию stdout): одна пара на строку, как print(ref)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdout
+
+    def write_block(self, block):
+        self.stream.write("".join([f"({t}, {i})\n" for t, i in block]))
+
+    def flush(self):
+        self.stream.flush()
+
+
+class FileSink(StreamSink):
+    """Файл с парами; открывается с большим буфером, закрывается через close()."""
+
+    def __init__(self, path):
+        super().__init__(open(path, "w", encoding="utf-8", buffering=1 << 20))
+
+    def close(self):
+        self.stream.close()
+
+
+class ListSink(RefSink):
+    """Пары накапливаются в списке self.refs."""
+
+    def __init__(self, refs=None):
+        self.refs = refs if refs is not None else []
+
+    def write_block(self, block):
+        self.refs.extend(block)
+
+
+class CallbackSink(RefSink):
+    """callback вызывается для каждого блока (списка пар)."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write_block(self, block):
+        self.callback(block)
+
 
+def make_sink(target):
+    # RefSink как есть; "-" — stdout; строка — путь к файлу;
+    # список — ListSink; вызываемый объект — CallbackSink
+    if isinstance(target, RefSink):
+        return target
+    if target == "-":
+        return StreamSink(sys.stdout)
+    if isinstance(target, str):
+        return FileSink(target)
+    if isinstance(target, list):
+        return ListSink(target)
+    if callable(target):
+        return CallbackSink(target)
+    if hasattr(target, "write"):
+        return StreamSink(target)
+    raise TypeError(f"неподдерживаемый приёмник пар: {target!r}")
 
 
 if __name__ == "__main__":
@@ -294,10 +1087,9 @@ if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python lexer.py source_file")
         sys.exit(1)
+    lexer = Lexer("")
     try:
-        filetext = open(sys.argv[1], "r", encoding="utf-8").read()
-    except Exception as e:
+        lexemes = lexer.tokenize_file(sys.argv[1], sink="-")
+    except (OSError, UnicodeDecodeError) as e:
         print("Ошибка чтения файла:", e); sys.exit(1)
-    lexer = Lexer(filetext)
-    lexemes = lexer.tokenize()
     print(lexemes)
\ No newline at end of file
@@ -0,0 +1,201 @@
+import re
+import struct
+
+# NumPy нужен только для пакетного перевода таблицы чисел (binary_texts);
+# без него то же делается циклом
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# -----------------------------
+# Числовые литералы
+# -----------------------------
+
+# Целые с основанием: 101b, 17o, 42d и 7fh (hex начинается с цифры)
+_BASES = {"b": 2, "o": 8, "d": 10}
+_SUFFIXED = re.compile(r"([0-9]+)([bod])|([0-9][0-9a-f]*)h")
+# Остальные формы: целая часть, степень, дробная часть и ещё одна
+# степень (лексер пропускает и 1e5.5, показатели тогда складываются)
+_DECIMAL = re.compile(r"([0-9]+)(?:e([+-]?[0-9]+))?(?:\.([0-9]+)(?:e([+-]?[0-9]+))?)?")
+
+
+def number_type(text):
+    # Тип литерала по правилу семантики: с '.' или 'e-' — дробный (!),
+    # остальные — целые (%)
+    text = text.lower()
+    return "!" if "." in text or "e-" in text else "%"
+
+
+def decode_number(text):
+    """Значение числового литерала в любой форме, которую принимает
+    лексер: int для целых, float для дробных (тип — как у number_type).
+    Неправильная запись — ValueError."""
+    t = text.lower()
+    m = _SUFFIXED.fullmatch(t)
+    if m is not None:
+        digits, suffix, hex_digits = m.groups()
+        try:
+            if hex_digits is not None:
+                return int(hex_digits, 16)
+            return int(digits, _BASES[suffix])
+        except ValueError:
+            raise ValueError(f"неправильный формат числа '{text}'") from None
+    m = _DECIMAL.fullmatch(t)
+    if m is None:
+        raise ValueError(f"неправильный формат числа '{text}'")
+    digits, exp1, frac, exp2 = m.groups()
+    exp = int(exp1 or 0) + int(exp2 or 0)
+    if number_type(t) == "%":
+        # без дробной части и отрицательной степени — целое
+        return int(digits) * 10 ** exp
+    return float(f"{digits}.{frac or 0}e{exp}")
+
+
+class Literal:
+    """Разобранный числовой литерал (запись таблицы 3).
+
+    Запись создаёт таблица чисел лексера, одну на каждую разную лексему;
+    парсер кладёт её в узел числа (parser.Number), так что семантика,
+    оптимизатор и генераторы кода видят уже разобранный литерал.
+
+    text — лексема как в исходнике, base — основание (2, 8, 10 или 16),
+    type — тип по правилу семантики (% или !). Значение (value) и
+    двоичная запись для вкладки чисел (binary) считаются при первом
+    обращении и запоминаются: у 1e999999 значение — очень длинное целое,
+    а лексеру и семантике оно не нужно.
+    """
+    __slots__ = ("text", "base", "type", "_value", "_binary")
+
+    def __init__(self, text):
+        self.text = text
+        low = text.lower()
+        m = _SUFFIXED.fullmatch(low)
+        if m is None:
+            self.base = 10
+        else:
+            self.base = 16 if m.group(3) is not None else _BASES[m.group(2)]
+        self.type = "!" if "." in low or "e-" in low else "%"
+        self._value = None
+        self._binary = None
+
+    @property
+    def value(self):
+        # int или float, как decode_number (ValueError для неправильной записи)
+        if self._value is None:
+            self._value = decode_number(self.text)
+        return self._value
+
+    @property
+    def binary(self):
+        if self._binary is None:
+            self._binary = binary_text(self.text)
+        return self._binary
+
+    def __repr__(self):
+        return f"Literal({self.text!r}, base={self.base}, type={self.type!r})"
+
+
+# ---------- двоичная запись для вкладки «Таблица 3» ----------
+# Текст тот же, что всегда показывал GUI, вместе с его особенностями:
+# у двоичных — запись и десятичное значение, у остальных целых — только
+# двоичные цифры; вещественным считается всё, где после отбрасывания
+# суффикса есть '.' или 'e' (так и 1e5h), и для него выводится запись
+# и 32 бита IEEE 754 одинарной точности.
+
+def int_binary(num_str):
+    try:
+        clean = num_str.strip().lower()
+        if clean.endswith("b"):
+            return f"{num_str} (десятичное: {int(clean[:-1], 2)})"
+        if clean.endswith("o"):
+            return bin(int(clean[:-1], 8))[2:]
+        if clean.endswith("h"):
+            return bin(int(clean[:-1], 16))[2:]
+        if clean.endswith("d"):
+            return bin(int(clean[:-1]))[2:]
+        return bin(int(clean))[2:]
+    except Exception as e:
+        return f"{num_str} (ошибка преобразования: {str(e)})"
+
+
+def float_binary(num_str):
+    try:
+        value = float(num_str.strip().lower())
+        bits = "".join(f"{c:08b}" for c in struct.pack("!f", value))
+        return f"{num_str}\n{bits}\n"
+    except Exception as e:
+        return f"{num_str} (ошибка преобразования: {str(e)})"
+
+
+def is_float_text(clean):
+    if "." not in clean and "e" not in clean:
+        return False
+    for suffix in ("b", "o", "h", "d"):
+        if clean.endswith(suffix):
+            clean = clean[:-1]
+            break
+    return "." in clean or "e" in clean
+
+
+def binary_text(num_str):
+    try:
+        clean = num_str.strip().lower()
+        if is_float_text(clean):
+            return float_binary(clean)
+        return int_binary(clean)
+    except Exception as e:
+        return f"{num_str} (ошибка преобразования: {str(e)})"
+
+
+def float_bits(values):
+    # 32 бита IEEE 754 (одинарная точность) для каждого значения строкой
+    # из '0' и '1'; None — значение не помещается в float32 (struct.pack
+    # для него падает). С NumPy — одним преобразованием массива
+    if np is None:
+        result = []
+        for value in values:
+            try:
+                result.append(format(int.from_bytes(struct.pack("!f", value), "big"), "032b"))
+            except OverflowError:
+                result.append(None)
+        return result
+    wide = np.array(values, dtype=np.float64)
+    with np.errstate(over="ignore"):
+        narrow = wide.astype(np.float32)
+    # как у struct.pack: конечное, ставшее в float32 бесконечностью
+    overflow = (np.isinf(narrow) & ~np.isinf(wide)).tolist()
+    shifts = np.arange(31, -1, -1, dtype=np.uint32)
+    digits = ((narrow.view(np.uint32)[:, None] >> shifts) & 1).astype(np.uint8) + ord("0")
+    text = digits.tobytes().decode("ascii")
+    return [None if bad else text[i * 32:i * 32 + 32] for i, bad in enumerate(overflow)]
+
+
+def binary_texts(records):
+    """Двоичная запись (Literal.binary) для всей таблицы чисел сразу.
+
+    Текст тот же, что у binary_text по одному; биты вещественных
+    считаются одним вызовом float_bits. Результат запоминается в
+    записях, повторный вызов ничего не пересчитывает.
+    """
+    floats, cleans, values = [], [], []
+    for record in records:
+        if record._binary is not None:
+            continue
+        clean = record.text.strip().lower()
+        if not is_float_text(clean):
+            record._binary = int_binary(clean)
+            continue
+        try:
+            value = float(clean)
+        except ValueError:
+            record._binary = float_binary(clean)
+            continue
+        floats.append(record)
+        cleans.append(clean)
+        values.append(value)
+    if values:
+        for record, clean, bits in zip(floats, cleans, float_bits(values)):
+            # без битов — float_binary с сообщением об ошибке от struct
+            record._binary = f"{clean}\n{bits}\n" if bits is not None else float_binary(clean)
+    return [record.binary for record in records]
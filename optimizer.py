@@ -0,0 +1,191 @@
+import math
+from parser import Node, Number
+from literals import Literal
+from vm import INT_MIN, INT_MAX, arith_type
+
+# -----------------------------
+# Свёртка констант и удаление недостижимого кода
+# -----------------------------
+
+FOLD = {
+    "plus": lambda a, b: a + b,
+    "min": lambda a, b: a - b,
+    "mult": lambda a, b: a * b,
+    "div": lambda a, b: a / b,
+    "eq": lambda a, b: a == b,
+    "ne": lambda a, b: a != b,
+    "lt": lambda a, b: a < b,
+    "le": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "ge": lambda a, b: a >= b,
+    "and": lambda a, b: a & b,
+    "or": lambda a, b: a | b,
+}
+
+# Подписи счётчиков optimize (для CompileStats)
+OPTIMIZER_COUNTERS = ("folded", "pruned_branches", "pruned_loops", "removed_nodes")
+
+
+def constant(node):
+    # (значение, тип) литерала или None
+    if node is None:
+        return None
+    if node.kind == "number":
+        record = node.literal
+        return record.value, record.type
+    if node.kind == "bool":
+        return node.value == "true", "$"
+    return None
+
+
+def float_text(value):
+    # Запись дробного, которую Literal читает в то же значение и
+    # считает дробной: всегда с '.', степень без '+'
+    text = repr(value)
+    if "e" not in text:
+        return text
+    mantissa, exp = text.split("e")
+    if "." not in mantissa:
+        mantissa += ".0"
+    return f"{mantissa}e{int(exp)}"
+
+
+def literal_node(value, typ, node):
+    # Узел-литерал на месте node или None, если значение не записать
+    # литералом (у литералов нет знака, нет inf и nan)
+    if typ == "$":
+        text = "true" if value else "false"
+        return Node("bool", text, pos=node._pos, offset=node.offset, lines=node.lines)
+    if typ == "%":
+        if value < 0:
+            return None
+        text = str(value)
+    else:
+        if not math.isfinite(value) or math.copysign(1.0, value) < 0:
+            return None
+        text = float_text(value)
+    return Number(text, Literal(text), pos=node._pos, offset=node.offset, lines=node.lines)
+
+
+def count_nodes(node):
+    count, stack = 0, [node]
+    while stack:
+        item = stack.pop()
+        if item is not None:
+            count += 1
+            stack.extend(item.children)
+    return count
+
+
+class Optimizer:
+    """Свёртка констант и удаление недостижимых веток для проверенного
+    дерева (после Semantic).
+
+    binop и unop с литералами вместо операндов заменяются литералом по
+    правилам типов semantic.py (%/!/$); значение считается так же, как
+    при выполнении. Выражения, которые при выполнении дали бы ошибку
+    (деление на ноль, переполнение %), и результаты, которые нельзя
+    записать литералом (отрицательные, inf), остаются как есть — ошибка
+    произойдёт в том же месте. if с постоянным условием заменяется нужной
+    веткой, do while с ложным условием удаляется, у for с ложным условием
+    остаются только начало и проверка. Дерево меняется на месте;
+    в stats — сколько выражений свёрнуто, веток и циклов убрано и узлов
+    удалено.
+    """
+
+    def __init__(self):
+        self.stats = dict.fromkeys(OPTIMIZER_COUNTERS, 0)
+
+    def optimize(self, program):
+        # Обход в обратном порядке без рекурсии: узел заменяется после
+        # того, как заменены его дети
+        stack = [(program, False)]
+        while stack:
+            node, done = stack.pop()
+            if not done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children if child is not None)
+                continue
+            children = []
+            for child in node.children:
+                if child is None:
+                    children.append(None)
+                    continue
+                new = self.replace(child)
+                if new is None:
+                    if node.kind in ("compound", "program"):
+                        # из списка операторов удалённый просто выпадает
+                        continue
+                    # на месте единственного оператора — пустой составной
+                    new = Node("compound")
+                children.append(new)
+            node.children = tuple(children) if isinstance(node.children, tuple) else children
+        return program
+
+    def removed(self, node):
+        if node is not None:
+            self.stats["removed_nodes"] += count_nodes(node)
+
+    def replace(self, node):
+        # Замена узла после оптимизации его детей (None — удалить оператор)
+        kind = node.kind
+        if kind == "binop":
+            left, right = constant(node.children[0]), constant(node.children[1])
+            if left is None or right is None:
+                return node
+            try:
+                value = FOLD[node.value](left[0], right[0])
+            except (ZeroDivisionError, OverflowError):
+                return node
+            typ = arith_type(node.value, left[1], right[1])
+            if typ == "%" and not INT_MIN <= value <= INT_MAX:
+                return node
+            return self.folded(node, value, typ)
+        if kind == "unop":
+            operand = constant(node.children[0])
+            return node if operand is None else self.folded(node, not operand[0], "$")
+        if kind == "if":
+            cond, then, other = node.children
+            value = constant(cond)
+            if value is None:
+                return node
+            self.stats["pruned_branches"] += 1
+            self.stats["removed_nodes"] += 1
+            self.removed(cond)
+            self.removed(other if value[0] else then)
+            return then if value[0] else other
+        if kind == "while":
+            value = constant(node.children[0])
+            if value is None or value[0]:
+                return node
+            self.stats["pruned_loops"] += 1
+            self.removed(node)
+            return None
+        if kind == "for":
+            init, cond, inc, body = node.children
+            value = constant(cond)
+            if value is None or value[0]:
+                return node
+            self.stats["pruned_loops"] += 1
+            if init is None:
+                self.removed(node)
+                return None
+            self.removed(inc)
+            self.removed(body)
+            node.children = [init, cond, None, Node("compound")]
+            return node
+        return node
+
+    def folded(self, node, value, typ):
+        result = literal_node(value, typ, node)
+        if result is None:
+            return node
+        self.stats["folded"] += 1
+        self.stats["removed_nodes"] += count_nodes(node) - 1
+        return result
+
+
+def optimize(program):
+    # Оптимизированное на месте дерево и статистика
+    optimizer = Optimizer()
+    return optimizer.optimize(program), optimizer.stats
@@ -1,16 +1,62 @@
-from lexer import Token
+from bisect import bisect_left
+from lexer import Token, TokenBuffer, TokenKind as K, KIND_NAMES
+from diagnostics import CompileError, ParseAbort, TooManyErrors, Cancelled
 
 # AST узлы
 
+# Общий пустой список детей для всех листьев (кортеж — чтобы его нельзя
+# было случайно изменить через один лист)
+NO_CHILDREN = ()
+
 class Node:
-    def __init__(self, kind, value=None, children=None, pos=None):
+    # __slots__ вместо __dict__ у каждого узла: дерево большой программы
+    # в несколько раз меньше
+    __slots__ = ("kind", "value", "children", "_pos", "offset", "lines")
+
+    def __init__(self, kind, value=None, children=None, pos=None, offset=None, lines=None):
         self.kind = kind
         self.value = value
-        self.children = children or []
-        self.pos = pos
+        self.children = children or NO_CHILDREN
+        self._pos = pos
+        # смещение в исходнике; строка и столбец считаются только по запросу
+        self.offset = offset
+        self.lines = lines
+
+    @property
+    def pos(self):
+        if self._pos is None and self.offset is not None:
+            return self.lines.position(self.offset)
+        return self._pos
 
     def __repr__(self):
-        return f"{self.kind}({self.value}, {self.children})"
+        return f"{self.kind}({self.value}, {list(self.children)})"
+
+
+class Program(Node):
+    # Корень дерева; spans, body_start и end нужны для reparse
+    __slots__ = ("spans", "body_start", "end")
+
+
+class Number(Node):
+    # Лист-число; literal — его разобранная запись (literals.Literal), та
+    # же, что в таблице 3: следующие фазы текст числа заново не разбирают
+    __slots__ = ("literal",)
+
+    def __init__(self, value, literal, pos=None, offset=None, lines=None):
+        super().__init__("number", value, pos=pos, offset=offset, lines=lines)
+        self.literal = literal
+
+
+def shift_offsets(nodes, delta):
+    # Сдвиг смещений во всех узлах поддеревьев (без рекурсии)
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if node.offset is not None:
+            node.offset += delta
+        stack.extend(node.children)
 
 # Pratt — таблица приоритетов
 
@@ -22,226 +68,464 @@ PRECEDENCE = {
     "mult": 50, "div": 50
 }
 
+# Токены, на которых парсер восстанавливается после ошибки, и какой
+# незаконченный оператор каждый из них закрывает (None — любой оператор:
+# ';' заканчивает оператор внутри {} или на верхнем уровне)
+SYNC_VALUES = {";": None, "}": "compound"}
+SYNC_KINDS = {K.KW_END_ELSE: "if", K.KW_LOOP: "while", K.KW_END: None}
+
 # PARSER
 
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, diagnostics=None, cancel=None):
+        if not isinstance(tokens, TokenBuffer):
+            tokens = TokenBuffer.from_tokens(tokens)
         self.tokens = tokens
+        self.kinds = tokens.kinds
+        self.lines = tokens.lines
         self.pos = 0
+        # С diagnostics (Diagnostics) ошибки записываются туда, и разбор
+        # продолжается; без него первая ошибка поднимается как исключение
+        self.diagnostics = diagnostics
+        # threading.Event: когда он установлен, разбор прекращается
+        # исключением Cancelled (проверяется на каждом операторе)
+        self.cancel = cancel
     def current(self):
         return self.tokens[self.pos]
+    def kind(self):
+        # Код вида текущего токена (TokenKind)
+        if self.pos >= len(self.kinds):
+            raise IndexError("list index out of range")
+        return self.kinds[self.pos]
+    def value(self):
+        # Значение текущего токена
+        if self.pos >= len(self.kinds):
+            raise IndexError("list index out of range")
+        return self.tokens.value(self.pos)
     def advance(self):
         tok = self.current()
         self.pos += 1
         return tok
     def expect(self, kind, value=None):
         tok = self.current()
-        if tok.kind != kind:
-            raise Exception(
-                f"Синтаксическая ошибка на {tok.line}:{tok.col}: ожидалось {kind}, получено {tok.kind}"
+        if tok.code != kind:
+            raise CompileError(
+                f"Синтаксическая ошибка на {tok.line}:{tok.col}: ожидалось {KIND_NAMES[kind]}, получено {tok.kind}",
+                "syntax", (tok.line, tok.col)
             )
         if value is not None and tok.value != value:
-            raise Exception(
-                f"Синтаксическая ошибка на {tok.line}:{tok.col}: ожидалось '{value}', получено '{tok.value}'"
+            raise CompileError(
+                f"Синтаксическая ошибка на {tok.line}:{tok.col}: ожидалось '{value}', получено '{tok.value}'",
+                "syntax", (tok.line, tok.col)
             )
         return self.advance()
     def parse_program(self):
-        self.expect("KW_PROGRAM")
-        self.expect("KW_VAR")
-        
-        decl = self.parse_declaration()
-
-        self.expect("KW_BEGIN")
-        stmts = []
-        while self.current().kind != "OP" and  self.current().kind != 'KW_END':
-            stmts.append(self.parse_statement())
-            if self.current().value == ";":
+        if self.diagnostics is None:
+            return self.parse_whole_program()
+        # Все ошибки, кроме тех, после которых разбирать нечего (конец
+        # файла), уже записаны в местах восстановления
+        try:
+            return self.parse_whole_program()
+        except (ParseAbort, TooManyErrors):
+            raise
+        except Exception as error:
+            self.diagnostics.report(error)
+            raise ParseAbort()
+    def parse_whole_program(self):
+        try:
+            self.expect(K.KW_PROGRAM)
+            self.expect(K.KW_VAR)
+
+            decl = self.parse_declaration()
+
+            self.expect(K.KW_BEGIN)
+        except Exception as error:
+            if self.diagnostics is None:
+                raise
+            decl = self.recover_header(error)
+        body_start = self.pos
+        stmts, spans = [], []
+        self.parse_body(stmts, spans)
+        return self.finish_program(decl, stmts, spans, body_start)
+    def recover_header(self, error):
+        # Ошибка до begin: разбор продолжается с операторов, а объявления
+        # заменяются узлом "error" (анализатор такую программу не проверяет)
+        self.diagnostics.report(error)
+        bad = Node("error", offset=self.current().offset if self.pos < len(self.kinds) else None,
+                   lines=self.lines)
+        while self.pos < len(self.kinds) and self.kinds[self.pos] != K.KW_BEGIN:
+            self.pos += 1
+        if self.pos >= len(self.kinds):
+            raise ParseAbort()
+        self.advance()
+        return bad
+    def parse_body(self, stmts, spans, sync=None):
+        # Операторы между begin и end. spans — пары (начало, конец) в
+        # номерах токенов; конец — первый токен после оператора и его ';'.
+        # sync(конец) может остановить разбор, вернув истину.
+        while True:
+            while self.kind() != K.OP and  self.kind() != K.KW_END:
+                start = self.pos
+                stmts.append(self.parse_statement())
+                if self.value() == ";":
+                    self.advance()
+                spans.append((start, self.pos))
+                if sync is not None and sync(self.pos):
+                    return True
+            if self.diagnostics is None or self.kind() == K.KW_END:
+                return False
+            # лишний знак вместо оператора: та же ошибка, что дала бы
+            # finish_program, и разбор со следующего оператора
+            start = self.pos
+            try:
+                self.expect(K.KW_END)
+            except Exception as error:
+                stmts.append(self.recover([], error))
+            if self.value() == ";":
                 self.advance()
-            #print(self.current().value)
-        self.expect("KW_END")
-        self.expect("OP", ".")
-        return Node("program", children=[decl] + stmts)
+            spans.append((start, self.pos))
+    def finish_program(self, decl, stmts, spans, body_start):
+        self.expect(K.KW_END)
+        try:
+            self.expect(K.OP, ".")
+        except Exception as error:
+            if self.diagnostics is None:
+                raise
+            self.diagnostics.report(error)
+        program = Program("program", children=[decl] + stmts)
+        program.spans = spans
+        program.body_start = body_start
+        program.end = self.pos
+        return program
+    def reparse(self, program, damage):
+        # Инкрементальный разбор: program — дерево для прошлого потока
+        # токенов, damage — Lexer.damage после relex (заменённые токены
+        # [start, old_end) стали [start, new_end), delta — сдвиг смещений).
+        # Операторы верхнего уровня, которые правка не задела, берутся из
+        # старого дерева; заново разбираются только операторы с начала
+        # первого задетого до первой границы операторов после правки,
+        # совпадающей со старой границей (дальше разбор был бы тем же).
+        start, old_end, new_end, delta = damage
+        if start < program.body_start:
+            return self.parse_program()
+        dt = new_end - old_end
+        spans = program.spans
+        old_stmts = program.children[1:]
+
+        # Оператор задет, если правка начинается не дальше токена сразу
+        # после него (парсер смотрит на этот токен, решая, где конец)
+        k = 0
+        while k < len(spans) and spans[k][1] < start:
+            k += 1
+        stmts, new_spans = old_stmts[:k], spans[:k]
+        if k < len(spans):
+            self.pos = spans[k][0]
+        else:
+            self.pos = spans[-1][1] if spans else program.body_start
+
+        old_starts = [s for s, _ in spans]
+        resume = []
+
+        def sync(pos):
+            if pos < new_end:
+                return False
+            m = bisect_left(old_starts, pos - dt, k)
+            if m < len(old_starts) and old_starts[m] == pos - dt:
+                resume.append(m)
+                return True
+            return False
+
+        if self.parse_body(stmts, new_spans, sync):
+            m = resume[0]
+            tail = old_stmts[m:]
+            if delta:
+                shift_offsets(tail, delta)
+            stmts.extend(tail)
+            new_spans.extend((s + dt, e + dt) for s, e in spans[m:])
+            self.pos = new_spans[-1][1]
+        return self.finish_program(program.children[0], stmts, new_spans, program.body_start)
     def parse_declaration(self):
-        self.expect("KW_DIM")
+        self.expect(K.KW_DIM)
         vars_ = []
-        id_tok = self.expect("ID")
-        vars_.append(Node("var", id_tok.value, pos=(id_tok.line, id_tok.col)))
+        id_tok = self.expect(K.ID)
+        vars_.append(Node("var", id_tok.value, offset=id_tok.offset, lines=self.lines))
 
-        while self.current().value == ",":
+        while self.value() == ",":
             self.advance()
-            id_tok = self.expect("ID")
-            vars_.append(Node("var", id_tok.value, pos=(id_tok.line, id_tok.col)))
+            id_tok = self.expect(K.ID)
+            vars_.append(Node("var", id_tok.value, offset=id_tok.offset, lines=self.lines))
         
-        if self.current().value in ("%", "!", "$"):
+        if self.value() in ("%", "!", "$"):
             type_tok = self.current()
             self.advance()
-            return Node("decl", type_tok.value, vars_, pos=(type_tok.line, type_tok.col))
+            return Node("decl", type_tok.value, vars_, offset=type_tok.offset, lines=self.lines)
         else:
-            raise Exception(
-            f"Синтаксическая ошибка: неправильная лексема '{self.current().value}' на {self.current().line}:{self.current().col}"
-        )
-    def parse_compound(self):
-        lbrace = self.expect("OP", "{")
-
-        stmts = [self.parse_statement()]
-
-        while self.current().value == ";":
-            self.advance()
-            if self.current().value == "}":
-                break
-            stmts.append(self.parse_statement())
-
-        self.expect("OP", "}")
-
-        return Node(
-            "compound",
-            children=stmts,
-            pos=(lbrace.line, lbrace.col)
+            raise CompileError(
+            f"Синтаксическая ошибка: неправильная лексема '{self.value()}' на {self.current().line}:{self.current().col}",
+            "syntax", (self.current().line, self.current().col)
         )
     def parse_assignment(self):
-        if self.current().kind == "KW_LET":
+        if self.kind() == K.KW_LET:
             self.advance()
-        id_tok = self.expect("ID")
-        self.expect("OP", "eq")
+        id_tok = self.expect(K.ID)
+        self.expect(K.OP, "eq")
         expr = self.parse_expression()
 
         return Node(
             "assign",
             id_tok.value,
             [expr],
-            pos=(id_tok.line, id_tok.col)
+            offset=id_tok.offset, lines=self.lines
         )
-    def parse_if(self):
-        if_tok = self.advance()
-        cond = self.parse_expression()
-        self.expect("KW_THEN")
-        then_stmt = self.parse_statement()
-
-        else_stmt = None
-        if self.current().kind == "KW_ELSE":
-            self.advance()
-            else_stmt = self.parse_statement()
-        self.expect("KW_END_ELSE")
-        return Node("if", children=[cond, then_stmt, else_stmt], pos=(if_tok.line, if_tok.col))
-    def parse_while(self):
-        w = self.advance()
-        self.expect("KW_WHILE")
-        cond = self.parse_expression()
-        body = self.parse_statement()
-        self.expect("KW_LOOP")
-        return Node("while", children=[cond, body], pos=(w.line, w.col))
-    def parse_for(self):
-        f = self.advance()
-        self.expect("OP", "(")
-        if self.current().value != ";":
+    def parse_for_header(self):
+        # '(' init ';' cond ';' inc ')' — любая из трёх частей может быть пустой
+        self.expect(K.OP, "(")
+        if self.value() != ";":
             #self.advance()
             init = self.parse_expression()
         else:
             init = None
-        self.expect("OP", ";")
-        if self.current().value != ";":
+        self.expect(K.OP, ";")
+        if self.value() != ";":
             cond = self.parse_expression()
         else:
             cond = None
-        self.expect("OP", ";")
-        if self.current().value != ")":
+        self.expect(K.OP, ";")
+        if self.value() != ")":
             inc = self.parse_expression()
         else:
             inc = None
-        self.expect("OP", ")")
-        body = self.parse_statement()
-        #print(init)
-        #print(cond)
-        #print(inc)
-        #print(body)
-        return Node("for", children=[init, cond, inc, body], pos=(f.line, f.col))
+        self.expect(K.OP, ")")
+        return [init, cond, inc]
     def parse_input(self):
         r = self.advance()
-        self.expect("OP", "(")
-        ids = [self.expect("ID").value]
-        while self.current().kind == "ID":
+        self.expect(K.OP, "(")
+        ids = [self.expect(K.ID).value]
+        while self.kind() == K.ID:
             #self.advance()
-            ids.append(self.expect("ID").value)
+            ids.append(self.expect(K.ID).value)
         
-        self.expect("OP", ")")
-        return Node("input", ids, pos=(r.line, r.col))
+        self.expect(K.OP, ")")
+        return Node("input", ids, offset=r.offset, lines=self.lines)
     def parse_output(self):
         w = self.advance()
-        self.expect("OP", "(")
+        self.expect(K.OP, "(")
         args = [self.parse_expression()]
-        self.expect("OP", ")")
-        return Node("output", children=args, pos=(w.line, w.col))
-    def parse_simple_statement(self):
-        tok = self.current()
-
-        #if tok.kind in ("KW_DIM"):
+        self.expect(K.OP, ")")
+        return Node("output", children=args, offset=w.offset, lines=self.lines)
+    def parse_statement(self):
+        # Разбор без рекурсии Python: начатые, но не законченные составные
+        # операторы, if и циклы лежат на явном стеке, поэтому глубина
+        # вложенности ограничена только памятью
+        stack = []
+        node = None
+        cancel = self.cancel
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            try:
+                if node is None:
+                    node = self.start_statement(stack)
+                if node is not None:
+                    node = self.finish_statement(stack, node)
+                    if node is not None:
+                        return node
+            except Exception as error:
+                if self.diagnostics is None:
+                    raise
+                node = self.recover(stack, error)
+                if node is not None and not stack:
+                    return node
+    def recover(self, stack, error):
+        # Режим паники: ошибка записывается, токены до ближайшего
+        # синхронизирующего (SYNC_VALUES, SYNC_KINDS) пропускаются. Токен
+        # закрывает ближайший незаконченный оператор своего вида, вложенные
+        # в него незаконченные операторы отбрасываются, а испорченная часть
+        # заменяется узлом "error". Возвращает законченный оператор или
+        # None, если разбор продолжается внутри оператора на стеке.
+        self.diagnostics.report(error)
+        tok = self.current() if self.pos < len(self.kinds) else None
+        bad = Node("error", offset=tok.offset if tok else None, lines=self.lines)
+        while True:
+            if self.pos >= len(self.kinds):
+                # до конца файла не нашлось, где продолжить
+                raise ParseAbort()
+            kind = self.kinds[self.pos]
+            if kind == K.OP:
+                target = SYNC_VALUES.get(self.tokens.value(self.pos), False)
+            else:
+                target = SYNC_KINDS.get(kind, False)
+            if target is False:
+                self.pos += 1
+                continue
+            # ближайший незаконченный оператор, который закрывает токен
+            # (для ';' — {}, end закрывает всё)
+            want = "compound" if target is None else target
+            i = len(stack) - 1
+            while i >= 0 and stack[i][0] != want:
+                i -= 1
+            if kind == K.KW_END or (i < 0 and target is None):
+                # оператор верхнего уровня кончился; ';' или end разберёт parse_body
+                del stack[:]
+                return bad
+            if i < 0:
+                # закрывать нечего: токен лишний
+                self.pos += 1
+                continue
+            break
+
+        del stack[i + 1:]
+        children = stack[-1][2]
+        if target is None:
+            # ';' внутри {}: разбор идёт дальше со следующего оператора
+            children.append(bad)
+            self.advance()
+            if self.value() != "}":
+                return None
+            self.expect(K.OP, "}")
+        else:
+            if target == "compound":
+                children.append(bad)
+            elif target == "if":
+                # [условие, then, else]; недостающие ветви — error и None
+                children[:] = (children + [bad, None])[:3]
+            else:
+                children[:] = (children + [bad])[:2]
+            self.advance()
+        kind, tok, children = stack.pop()
+        return Node(kind, children=children, offset=tok.offset, lines=self.lines)
+    def start_statement(self, stack):
+        # Простой оператор разбирается целиком и возвращается. У составного,
+        # if и циклов разбирается только заголовок, а на стек кладётся
+        # [вид, первый токен, дети] — дальше разбирается вложенный оператор
+        if self.value() == "{":
+            lbrace = self.expect(K.OP, "{")
+            stack.append(["compound", lbrace, []])
+            return None
+
+        kind = self.kind()
+
+        #if kind == K.KW_DIM:
         #    return self.parse_declaration()
 
-        if tok.kind in ("ID", "KW_LET"):
+        if kind == K.ID or kind == K.KW_LET:
             return self.parse_assignment()
 
-        if tok.kind == "KW_IF":
-            return self.parse_if()
+        if kind == K.KW_IF:
+            if_tok = self.advance()
+            cond = self.parse_expression()
+            self.expect(K.KW_THEN)
+            stack.append(["if", if_tok, [cond]])
+            return None
 
-        if tok.kind == "KW_DO":
-            return self.parse_while()
+        if kind == K.KW_DO:
+            w = self.advance()
+            self.expect(K.KW_WHILE)
+            cond = self.parse_expression()
+            stack.append(["while", w, [cond]])
+            return None
 
-        if tok.kind == "KW_FOR":
-            return self.parse_for()
+        if kind == K.KW_FOR:
+            f = self.advance()
+            stack.append(["for", f, self.parse_for_header()])
+            return None
 
-        if tok.kind == "KW_INPUT":
+        if kind == K.KW_INPUT:
             return self.parse_input()
 
-        if tok.kind == "KW_OUTPUT":
+        if kind == K.KW_OUTPUT:
             return self.parse_output()
 
-        raise Exception(
-            f"Синтаксическая ошибка: неожиданная лексема '{tok.value}' на {tok.line}:{tok.col}"
+        tok = self.current()
+        raise CompileError(
+            f"Синтаксическая ошибка: неожиданная лексема '{tok.value}' на {tok.line}:{tok.col}",
+            "syntax", (tok.line, tok.col)
         )
-    def parse_statement(self):
-        if self.current().value == "{":
-            return self.parse_compound()
-        return self.parse_simple_statement()
+    def finish_statement(self, stack, node):
+        # node — законченный оператор: он добавляется к оператору на вершине
+        # стека, и так, пока тот тоже не закончится. None — оператор на
+        # вершине ждёт следующий вложенный оператор
+        while stack:
+            kind, tok, children = stack[-1]
+            children.append(node)
+            if kind == "compound":
+                if self.value() == ";":
+                    self.advance()
+                    if self.value() != "}":
+                        return None
+                self.expect(K.OP, "}")
+            elif kind == "if":
+                if len(children) == 2:
+                    if self.kind() == K.KW_ELSE:
+                        self.advance()
+                        return None
+                    children.append(None)
+                self.expect(K.KW_END_ELSE)
+            elif kind == "while":
+                self.expect(K.KW_LOOP)
+            stack.pop()
+            node = Node(kind, children=children, offset=tok.offset, lines=self.lines)
+        return node
     def parse_expression(self, min_prec=0):
-        left = self.parse_prefix()
-
-        while self.current().kind == "OP":
-            op = self.current()
-            prec = PRECEDENCE.get(op.value)
-            if prec is None or prec < min_prec:
-                break
-
-            self.advance()
-            right = self.parse_expression(prec + 1)
-            left = Node("binop", op.value, [left, right], pos=(op.line, op.col))
-
-        return left
-    def parse_prefix(self):
-        tok = self.current()
-
-        if tok.kind == "ID":
-            self.advance()
-            return Node("id", tok.value, pos=(tok.line, tok.col))
-
-        if tok.kind == "NUMBER":
-            self.advance()
-            return Node("number", tok.value, pos=(tok.line, tok.col))
+        # Разбор по приоритетам (PRECEDENCE) без рекурсии. На стеке лежат
+        # незаконченные выражения: ("binop", op, левый операнд, min_prec)
+        # ждёт правый операнд, ("not", tok, None, min_prec) — операнд not,
+        # ("(", tok, None, min_prec) — закрывающую скобку; min_prec —
+        # приоритет объемлющего выражения, к которому вернётся разбор
+        stack = []
+        while True:
+            tok = self.current()
+            kind = tok.code
+
+            if kind == K.ID:
+                self.advance()
+                left = Node("id", tok.value, offset=tok.offset, lines=self.lines)
 
-        if tok.kind.startswith("KW_") and tok.value in ("true", "false"):
-            self.advance()
-            return Node("bool", tok.value, pos=(tok.line, tok.col))
+            elif kind == K.NUMBER:
+                left = Number(tok.value, self.tokens.literal(self.pos),
+                              offset=tok.offset, lines=self.lines)
+                self.advance()
 
-        if tok.kind == "OP" and tok.value == "not":
-            self.advance()
-            operand = self.parse_expression(60)
-            return Node("unop", "not", [operand], pos=(tok.line, tok.col))
+            elif (kind == K.KW_TRUE or kind == K.KW_FALSE) and tok.value in ("true", "false"):
+                self.advance()
+                left = Node("bool", tok.value, offset=tok.offset, lines=self.lines)
 
-        if tok.value == "(":
-            self.advance()
-            expr = self.parse_expression()
-            self.expect("OP", ")")
-            return expr
+            elif kind == K.OP and tok.value == "not":
+                self.advance()
+                stack.append(("not", tok, None, min_prec))
+                min_prec = 60
+                continue
 
-        raise Exception(
-            f"Синтаксическая ошибка: неожиданная лексема '{tok.value}' на {tok.line}:{tok.col}"
-        )
+            elif tok.value == "(":
+                self.advance()
+                stack.append(("(", tok, None, min_prec))
+                min_prec = 0
+                continue
+
+            else:
+                raise CompileError(
+                    f"Синтаксическая ошибка: неожиданная лексема '{tok.value}' на {tok.line}:{tok.col}",
+                    "syntax", (tok.line, tok.col)
+                )
+
+            # Операнд разобран: пока следующая операция не слабее min_prec,
+            # операнд уходит на стек и разбирается правая часть; иначе
+            # выражение закончено и достраивается то, что лежит на стеке
+            while True:
+                if self.kind() == K.OP:
+                    op = self.current()
+                    prec = PRECEDENCE.get(op.value)
+                    if prec is not None and prec >= min_prec:
+                        self.advance()
+                        stack.append(("binop", op, left, min_prec))
+                        min_prec = prec + 1
+                        break
+                if not stack:
+                    return left
+                what, tok, lhs, min_prec = stack.pop()
+                if what == "binop":
+                    left = Node("binop", tok.value, (lhs, left), offset=tok.offset, lines=self.lines)
+                elif what == "not":
+                    left = Node("unop", "not", (left,), offset=tok.offset, lines=self.lines)
+                else:
+                    self.expect(K.OP, ")")
@@ -0,0 +1,249 @@
+import sys
+import marshal
+from vm import ZERO, INT_MIN, INT_MAX, arith_type, parse_input, read_words
+
+# -----------------------------
+# Перевод программы в исходник на Python
+# -----------------------------
+
+PY_OPS = {
+    "plus": "+", "min": "-", "mult": "*",
+    "eq": "==", "ne": "!=", "lt": "<", "le": "<=", "gt": ">", "ge": ">=",
+    # операнды — bool, & и | дают bool и вычисляют обе части, как VM
+    "and": "&", "or": "|",
+}
+
+
+def py_literal(value):
+    if value == float("inf"):
+        return "1e999"
+    if isinstance(value, int) and not INT_MIN <= value <= INT_MAX:
+        # repr длинных целых упирается в предел sys.set_int_max_str_digits
+        return hex(value)
+    return repr(value)
+
+
+class PyGen:
+    """Исходник функции main(_read, _write, _div, _overflow) для
+    проверенного дерева.
+
+    Переменные — локальные v_<имя>, if/do while/for — if и while Python.
+    Семантика та же, что у VM: целые 64-битные (проверка после каждой
+    целой операции), and/or вычисляют обе части, "x eq выражение" в
+    начале и шаге for — присваивание. Позиции для ошибок выполнения
+    собираются в positions, в коде остаётся только номер позиции.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.depth = 1
+        self.types = {}
+        self.slots = {}
+        self.positions = []
+
+    def put(self, text):
+        self.lines.append("    " * self.depth + text)
+
+    def position(self, node):
+        self.positions.append(node.pos)
+        return len(self.positions) - 1
+
+    def source(self, program):
+        decl = program.children[0]
+        for var in decl.children:
+            self.slots[var.value] = len(self.slots)
+            self.types[var.value] = decl.value
+        self.lines.append("def main(_read, _write, _div, _overflow):")
+        for name in self.slots:
+            self.put(f"v_{name} = {ZERO[decl.value]!r}")
+        for stmt in program.children[1:]:
+            self.statement(stmt)
+        return "\n".join(self.lines) + "\n"
+
+    def statement(self, node):
+        # Без рекурсии, как CodeGen: операторы с вложенными — генераторы
+        stack = []
+        gen = getattr(self, "stmt_" + node.kind)(node)
+        if gen is not None:
+            stack.append(gen)
+        while stack:
+            try:
+                child = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                continue
+            gen = getattr(self, "stmt_" + child.kind)(child)
+            if gen is not None:
+                stack.append(gen)
+
+    def close(self):
+        # конец блока; пустой (тело, убранное optimizer) — pass
+        if self.lines[-1].endswith(":"):
+            self.put("pass")
+        self.depth -= 1
+
+    # ---------- операторы ----------
+
+    def stmt_assign(self, node):
+        self.store(node.value, node.children[0])
+
+    def stmt_input(self, node):
+        k = self.position(node)
+        for name in node.value:
+            self.put(f"v_{name} = _read({self.slots[name]}, {k})")
+
+    def stmt_output(self, node):
+        text, typ = self.expression(node.children[0])
+        if typ == "$":
+            self.put(f"_write('true\\n' if {text} else 'false\\n')")
+        else:
+            self.put(f"_write(f'{{{text}}}\\n')")
+
+    def stmt_compound(self, node):
+        for stmt in node.children:
+            yield stmt
+
+    def stmt_if(self, node):
+        cond, then, other = node.children
+        self.put(f"if {self.expression(cond)[0]}:")
+        self.depth += 1
+        yield then
+        self.close()
+        if other is not None:
+            self.put("else:")
+            self.depth += 1
+            yield other
+            self.close()
+
+    def stmt_while(self, node):
+        cond, body = node.children
+        self.put(f"while {self.expression(cond)[0]}:")
+        self.depth += 1
+        yield body
+        self.close()
+
+    def stmt_for(self, node):
+        init, cond, inc, body = node.children
+        if init is not None:
+            self.effect(init)
+        self.put(f"while {self.expression(cond)[0] if cond is not None else 'True'}:")
+        self.depth += 1
+        yield body
+        if inc is not None:
+            self.effect(inc)
+        self.close()
+
+    def effect(self, node):
+        # как CodeGen.effect
+        if node.kind == "binop" and node.value == "eq" and node.children[0].kind == "id":
+            self.store(node.children[0].value, node.children[1])
+        else:
+            self.put(self.expression(node)[0])
+
+    def store(self, name, expr):
+        text, typ = self.expression(expr)
+        if typ != self.types[name]:
+            text = f"float({text})"
+        self.put(f"v_{name} = {text}")
+
+    # ---------- выражения ----------
+
+    def expression(self, node):
+        # (текст выражения, тип)
+        order = []
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            order.append(item)
+            stack.extend(item.children)
+        values = []
+        for item in reversed(order):
+            kind = item.kind
+            if kind == "id":
+                values.append((f"v_{item.value}", self.types[item.value]))
+            elif kind == "number":
+                record = item.literal
+                values.append((py_literal(record.value), record.type))
+            elif kind == "bool":
+                values.append(("True" if item.value == "true" else "False", "$"))
+            elif kind == "unop":
+                values[-1] = (f"(not {values[-1][0]})", "$")
+            else:
+                right, rtype = values.pop()
+                left, ltype = values[-1]
+                op = item.value
+                typ = arith_type(op, ltype, rtype)
+                if op == "div":
+                    text = f"_div({left}, {right}, {self.position(item)})"
+                elif typ == "%":
+                    text = (f"(_t if {INT_MIN} <= (_t := {left} {PY_OPS[op]} {right}) <= {INT_MAX} "
+                            f"else _overflow({self.position(item)}))")
+                else:
+                    text = f"({left} {PY_OPS[op]} {right})"
+                values[-1] = (text, typ)
+        return values[0]
+
+
+class PyProgram:
+    """Скомпилированная программа: байт-код Python (marshal, чтобы
+    запись можно было положить в кэш), позиции для ошибок и переменные."""
+
+    def __init__(self, code, positions, names, types):
+        self.code = code
+        self.positions = positions
+        self.names = names
+        self.types = types
+
+    def error(self, k, message):
+        if k is None:
+            return Exception(f"Ошибка выполнения: {message}")
+        line, col = self.positions[k]
+        return Exception(f"Ошибка выполнения на {line}:{col}: {message}")
+
+    def run(self, inp=None, out=None):
+        # Выполнение; inp и out — как у VM
+        inp = inp if inp is not None else read_words(sys.stdin)
+        out = out if out is not None else sys.stdout
+        names, types, error = self.names, self.types, self.error
+
+        def read(slot, k):
+            word = next(inp, None)
+            if word is None:
+                raise error(k, f"нет входных данных для '{names[slot]}'")
+            value = parse_input(word, types[slot])
+            if value is None:
+                raise error(k, f"'{word}' не является значением типа {types[slot]} для '{names[slot]}'")
+            return value
+
+        def div(a, b, k):
+            try:
+                return a / b
+            except ZeroDivisionError:
+                raise error(k, "деление на ноль") from None
+            except OverflowError:
+                raise error(k, "переполнение") from None
+
+        def overflow(k):
+            raise error(k, "переполнение")
+
+        namespace = {}
+        exec(marshal.loads(self.code), namespace)
+        try:
+            namespace["main"](read, out.write, div, overflow)
+        except OverflowError:
+            # дробное из слишком большого целого
+            raise error(None, "переполнение") from None
+
+
+def compile_python(program):
+    # PyProgram для проверенного дерева или None, если Python не может
+    # скомпилировать исходник (слишком глубокая вложенность блоков или
+    # скобок) — тогда программу выполняет VM
+    gen = PyGen()
+    source = gen.source(program)
+    try:
+        code = compile(source, "<program>", "exec")
+    except (SyntaxError, RecursionError, MemoryError):
+        return None
+    return PyProgram(marshal.dumps(code), gen.positions, list(gen.slots),
+                     [gen.types[name] for name in gen.slots])
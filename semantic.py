@@ -1,16 +1,23 @@
+from inspect import isgeneratorfunction
+from diagnostics import CompileError, TooManyErrors, Cancelled
+
+GEN = -1
+
 class SymbolTable:
     def __init__(self):
         self.table = {}
     def declare(self, name, typ, pos):
         if name in self.table:
-            raise Exception(
-                f"Семантическая ошибка на {pos[0]}:{pos[1]}: переобъявление переменной '{name}'"
+            raise CompileError(
+                f"Семантическая ошибка на {pos[0]}:{pos[1]}: переобъявление переменной '{name}'",
+                "semantic", pos
             )
         self.table[name] = typ
     def lookup(self, name, pos):
         if name not in self.table:
-            raise Exception(
-                f"Семантическая ошибка на {pos[0]}:{pos[1]}: необъявленная переменная '{name}'"
+            raise CompileError(
+                f"Семантическая ошибка на {pos[0]}:{pos[1]}: необъявленная переменная '{name}'",
+                "semantic", pos
             )
         return self.table[name]
 def can_assign(target, source):
@@ -20,114 +27,251 @@ def can_assign(target, source):
             return True
         return False
 
+def make_dispatch(cls):
+    # Таблица вид узла -> (visit_*, способ вызова); строится один раз на
+    # класс, а не поиском метода по имени для каждого узла. Способы:
+    # генератор (отдаёт детей через yield и получает их типы), число —
+    # сколько типов детей visit_* получает уже вычисленными, 0 — лист
+    table = {}
+    for name in dir(cls):
+        if name.startswith("visit_"):
+            method = getattr(cls, name)
+            if isgeneratorfunction(method):
+                table[name[len("visit_"):]] = (method, GEN)
+            else:
+                table[name[len("visit_"):]] = (method, method.__code__.co_argcount - 2)
+    return table
+
 class Semantic:
-    def __init__(self):
+    # Обход идёт по явному стеку, без рекурсии Python: у операторов visit_*
+    # — генераторы (yield ребёнка возвращает его тип), выражения
+    # вычисляются в обратном порядке обхода — сначала типы детей.
+    # Виды узлов-операторов; остальные — выражения
+    statements = frozenset(("decl", "assign", "if", "while", "for", "input",
+                            "output", "compound", "error"))
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch = make_dispatch(cls)
+    def __init__(self, diagnostics=None, cancel=None):
         self.symbols = SymbolTable()
-    def analyze(self, node):
+        # операторы, уже прошедшие проверку (для повторного анализа)
+        self.checked = set()
+        # С diagnostics (Diagnostics) ошибка записывается туда, и анализ
+        # продолжается со следующего оператора; без него — исключение
+        self.diagnostics = diagnostics
+        # threading.Event: когда он установлен, анализ прекращается
+        # исключением Cancelled (проверяется на каждом составном операторе)
+        self.cancel = cancel
+    def analyze(self, node, previous=None):
+        # previous — анализатор прошлой компиляции: если объявления те же,
+        # операторы, взятые парсером из старого дерева без изменений,
+        # повторно не проверяются
+        reuse = set()
         for stmt in node.children:
-            self.visit(stmt)
+            if self.cancel is not None and self.cancel.is_set():
+                raise Cancelled()
+            if stmt not in reuse:
+                try:
+                    self.visit(stmt)
+                except TooManyErrors:
+                    raise
+                except Exception as error:
+                    if self.diagnostics is None:
+                        raise
+                    self.diagnostics.report(error)
+                    continue
+            self.checked.add(stmt)
+            if stmt.kind == "decl" and previous is not None \
+                    and previous.symbols.table == self.symbols.table:
+                reuse = previous.checked
+    def handler(self, node):
+        entry = self.dispatch.get(node.kind)
+        if entry is None:
+            raise CompileError(f"Семантическая ошибка на {node.pos[0]}:{node.pos[1]}: "
+                f"Неизвестная лексема {node.kind}", "semantic", node.pos)
+        return entry
     def visit(self, node):
-        method = getattr(self, f"visit_{node.kind}", None)
-        if not method:
-            raise Exception(f"Семантическая ошибка на {node.pos[0]}:{node.pos[1]}: "
-                f"Неизвестная лексема {node.kind}")
-        return method(node)
+        # Тип узла (для выражений). Незаконченные генераторы операторов
+        # лежат на стеке; законченный отдаёт свой результат тому, кто ждёт
+        # под ним. Выражения целиком считает expr_type.
+        method, mode = self.handler(node)
+        if mode != GEN:
+            return self.expr_type(node) if mode else method(self, node)
+        stack = [method(self, node)]
+        value = None
+        while stack:
+            try:
+                child = stack[-1].send(value)
+            except StopIteration as stop:
+                stack.pop()
+                value = stop.value
+                continue
+            except Exception as error:
+                # ошибка в самом операторе: он брошен, объемлющий идёт дальше
+                if self.diagnostics is None or len(stack) == 1:
+                    raise
+                self.diagnostics.report(error)
+                stack.pop()
+                value = None
+                continue
+            try:
+                method, mode = self.handler(child)
+                if mode == GEN:
+                    if self.cancel is not None and self.cancel.is_set():
+                        raise Cancelled()
+                    stack.append(method(self, child))
+                    value = None
+                elif mode == 0:
+                    value = method(self, child)
+                else:
+                    value = self.expr_type(child)
+            except Exception as error:
+                # ошибка в выражении или простом операторе внутри оператора
+                # на вершине: брошен тот, кому принадлежит выражение
+                if self.diagnostics is None:
+                    raise
+                if child.kind in self.statements:
+                    self.diagnostics.report(error)
+                    value = None
+                else:
+                    if len(stack) == 1:
+                        raise
+                    self.diagnostics.report(error)
+                    stack.pop().close()
+                    value = None
+        return value
+    def expr_type(self, node):
+        # Обход (узел, правый, левый) без рекурсии, развёрнутый задом
+        # наперёд, — это обратный порядок: дети раньше родителя, левый
+        # раньше правого. Типы детей копятся на стеке values.
+        order = []
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            order.append(item)
+            stack.extend(item.children)
+        dispatch = self.dispatch
+        values = []
+        for item in reversed(order):
+            entry = dispatch.get(item.kind)
+            if entry is None:
+                self.handler(item)
+            method, mode = entry
+            if mode == 0:
+                values.append(method(self, item))
+            elif mode == 2:
+                right = values.pop()
+                values[-1] = method(self, item, values[-1], right)
+            elif mode == 1:
+                values[-1] = method(self, item, values[-1])
+            else:
+                values.append(self.visit(item))
+        return values[0]
+    def lookup(self, name, node):
+        # Позиция узла нужна только для текста ошибки
+        typ = self.symbols.table.get(name)
+        if typ is None:
+            return self.symbols.lookup(name, node.pos)
+        return typ
     def visit_decl(self, node):
         var_type = node.value
         for var in node.children:
             self.symbols.declare(var.value, var_type, var.pos)
     def visit_assign(self, node):
         var_name = node.value
-        var_type = self.symbols.lookup(var_name, node.pos)
+        var_type = self.lookup(var_name, node)
 
-        expr_type = self.visit(node.children[0])
+        expr_type = yield node.children[0]
 
         if not can_assign(var_type, expr_type):
-            raise Exception(
+            raise CompileError(
                 f"Семантическая ошибка на {node.pos[0]}:{node.pos[1]}: "
-                f"невозможно присвоить {expr_type} к {var_type}"
+                f"невозможно присвоить {expr_type} к {var_type}",
+                "semantic", node.pos
             )
     def visit_if(self, node):
-        cond_type = self.visit(node.children[0])
+        cond_type = yield node.children[0]
         if cond_type != "$":
-            raise Exception(
+            raise CompileError(
                 f"Семантическая ошибка на {node.pos[0]}:{node.pos[1]}: "
-                f"условие в if должно быть $"
+                f"условие в if должно быть $",
+                "semantic", node.pos
             )
 
-        self.visit(node.children[1])
+        yield node.children[1]
         if node.children[2]:
-            self.visit(node.children[2])
+            yield node.children[2]
     def visit_while(self, node):
-        cond_type = self.visit(node.children[0])
+        cond_type = yield node.children[0]
         if cond_type != "$":
-            raise Exception(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
-                f"условие в while должно быть $")
+            raise CompileError(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
+                f"условие в while должно быть $", "semantic", node.children[0].pos)
 
-        self.visit(node.children[1])
+        yield node.children[1]
     def visit_for(self, node):
         init, cond, inc, body = node.children
         # init — если есть
         if init is not None:
-            self.visit(init)
+            yield init
         # cond — если есть
         if cond is not None:
-            cond_type = self.visit(cond)
+            cond_type = yield cond
             if cond_type != "$":
-                raise Exception(
+                raise CompileError(
                     f"Семантическая ошибка на {cond.pos[0]}:{cond.pos[1]}: "
-                    f"условие в for должно быть логическим ($)"
+                    f"условие в for должно быть логическим ($)",
+                    "semantic", cond.pos
                 )
         # inc — если есть
         if inc is not None:
-            self.visit(inc)
+            yield inc
         # тело цикла — всегда есть
-        self.visit(body)
+        yield body
     def visit_input(self, node):
         for name in node.value:
-            self.symbols.lookup(name, node.pos)
+            self.lookup(name, node)
     def visit_output(self, node):
         for expr in node.children:
-            self.visit(expr)
+            yield expr
     def visit_id(self, node):
-        return self.symbols.lookup(node.value, node.pos)
+        return self.lookup(node.value, node)
     def visit_number(self, node):
-        if "." in node.value or "e-" in node.value.lower():
-            return "!"
-        return "%"
+        return node.literal.type
     def visit_bool(self, node):
         return "$"
-    def visit_unop(self, node):
-        operand_type = self.visit(node.children[0])
+    def visit_unop(self, node, operand_type):
         if operand_type != "$":
-            raise Exception(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
-                f"'not' применим только к $")
+            raise CompileError(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
+                f"'not' применим только к $", "semantic", node.children[0].pos)
         return "$"
-    def visit_binop(self, node):
-        left = self.visit(node.children[0])
-        right = self.visit(node.children[1])
+    def visit_binop(self, node, left, right):
         op = node.value
 
         if op in ("plus", "min", "mult", "div"):
             if left not in ("%", "!") or right not in ("%", "!"):
-                raise Exception(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
-                f"арифметические операции применимы только к числам")
+                raise CompileError(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
+                f"арифметические операции применимы только к числам", "semantic", node.children[0].pos)
             if op == "div" and left == "%":
-                raise Exception(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
-                f"делимое должно быть дробным числом")
+                raise CompileError(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
+                f"делимое должно быть дробным числом", "semantic", node.children[0].pos)
             return "!" if "!" in (left, right) else "%"
 
         if op in ("and", "or"):
             if left != "$" or right != "$":
-                raise Exception(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
-                f"логические операции применимы только к $")
+                raise CompileError(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
+                f"логические операции применимы только к $", "semantic", node.children[0].pos)
             return "$"
 
         if op in ("eq", "ne", "lt", "le", "gt", "ge"):
             if left != right:
-                raise Exception(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
-                f"сравниваемые переменные должны быть одного типа")
+                raise CompileError(f"Семантическая ошибка на {node.children[0].pos[0]}:{node.children[0].pos[1]}: "
+                f"сравниваемые переменные должны быть одного типа", "semantic", node.children[0].pos)
             return "$"
+    def visit_error(self, node):
+        # оператор, который парсер не смог разобрать (ошибка уже записана)
+        return None
     def visit_compound(self, node):
         for stmt in node.children:
-            self.visit(stmt)
\ No newline at end of file
+            yield stmt
+
+Semantic.dispatch = make_dispatch(Semantic)
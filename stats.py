@@ -0,0 +1,211 @@
+import os
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from lexer import KIND_NAMES
+from diagnostics import BudgetExceeded
+
+
+# Подписи счётчиков в таблице (в JSON — ключи как есть)
+COUNTER_LABELS = {
+    "chars": "символов",
+    "tokens": "токенов",
+    "distinct_numbers": "разных чисел",
+    "distinct_identifiers": "разных идентификаторов",
+    "nodes": "узлов",
+    "max_depth": "глубина дерева",
+    "symbols": "объявлено переменных",
+    "instructions": "выполнено команд",
+    "folded": "свёрнуто выражений",
+    "pruned_branches": "убрано ветвей if",
+    "pruned_loops": "убрано циклов",
+    "removed_nodes": "удалено узлов",
+}
+
+MB = 1 << 20
+
+# Сколько памяти нужно фазам (замерено на bench.generator): лексеру — на
+# символ исходника, парсеру — на токен
+LEX_BYTES_PER_CHAR = 16
+PARSE_BYTES_PER_TOKEN = 80
+
+
+def no_phase(name):
+    # Замена CompileStats.phase, когда статистика не собирается
+    return nullcontext()
+
+
+class CompileStats:
+    """Время фаз и счётчики одной компиляции.
+
+    Фазы замеряются через phase(имя); счётчики собираются один раз по
+    готовым результатам (буфер токенов, таблицы, дерево), поэтому лексер,
+    парсер и анализатор ничего не считают по ходу работы.
+
+    С memory=True по данным tracemalloc для каждой фазы запоминаются пик
+    памяти, сколько памяти осталось занято после неё и top мест, которые
+    выделили больше всего. tracemalloc заметно замедляет работу, время
+    фаз в этом режиме завышено.
+    """
+
+    def __init__(self, memory=False, top=5):
+        self.phases = {}      # имя -> (настенное время, время ЦП)
+        self.counters = {}
+        self.token_kinds = {}
+        self.node_kinds = {}
+        self.memory = memory
+        self.top = top
+        self.memory_phases = {}   # имя -> (пик, осталось, [(место, байт, блоков)])
+        self.memory_base = None
+        self.snapshot = None
+
+    @contextmanager
+    def phase(self, name):
+        if self.memory:
+            self.memory_start()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.phases[name] = (time.perf_counter() - wall, time.process_time() - cpu)
+            if self.memory:
+                self.memory_end(name)
+
+    def take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def memory_start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.memory_base is None:
+            self.memory_base = tracemalloc.get_traced_memory()[0]
+            self.snapshot = self.take_snapshot()
+        tracemalloc.reset_peak()
+
+    def memory_end(self, name):
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = self.take_snapshot()
+        top = [(f"{os.path.basename(st.traceback[0].filename)}:{st.traceback[0].lineno}",
+                st.size_diff, st.count_diff)
+               for st in snapshot.compare_to(self.snapshot, "lineno")[:self.top]
+               if st.size_diff > 0]
+        self.snapshot = snapshot
+        self.memory_phases[name] = (peak - self.memory_base, current - self.memory_base, top)
+
+    def count_tokens(self, tokens, tables=None):
+        self.counters["chars"] = tokens.lines.size
+        self.counters["tokens"] = len(tokens)
+        kinds = Counter(tokens.kinds)
+        self.token_kinds = {KIND_NAMES[k]: kinds[k] for k in sorted(kinds)}
+        if tables is not None:
+            self.counters["distinct_numbers"] = len(tables[3])
+            self.counters["distinct_identifiers"] = len(tables[4])
+
+    def count_tree(self, ast):
+        kinds = Counter()
+        depth = 0
+        stack = [(ast, 1)]
+        while stack:
+            node, level = stack.pop()
+            if node is None:
+                continue
+            kinds[node.kind] += 1
+            if level > depth:
+                depth = level
+            stack.extend((child, level + 1) for child in node.children)
+        self.counters["nodes"] = sum(kinds.values())
+        self.counters["max_depth"] = depth
+        self.node_kinds = dict(kinds.most_common())
+
+    def count_symbols(self, count):
+        self.counters["symbols"] = count
+
+    def count_instructions(self, count):
+        self.counters["instructions"] = count
+
+    def count_optimizer(self, counts):
+        # counts — Optimizer.stats
+        self.counters.update(counts)
+
+    def as_dict(self):
+        return {
+            "phases": {name: {"wall": wall, "cpu": cpu}
+                       for name, (wall, cpu) in self.phases.items()},
+            "counters": dict(self.counters),
+            "tokens": dict(self.token_kinds),
+            "nodes": dict(self.node_kinds),
+            "memory": {name: {"peak": peak, "retained": retained,
+                              "top": [{"where": where, "size": size, "count": count}
+                                      for where, size, count in top]}
+                       for name, (peak, retained, top) in self.memory_phases.items()},
+        }
+
+    def format_table(self):
+        lines = [f"{'фаза':<12} {'время, мс':>10} {'ЦП, мс':>10}"]
+        for name, (wall, cpu) in self.phases.items():
+            lines.append(f"{name:<12} {wall * 1000:>10.2f} {cpu * 1000:>10.2f}")
+        total = sum(wall for wall, _ in self.phases.values())
+        lines.append(f"{'всего':<12} {total * 1000:>10.2f}")
+        lines.append("")
+        for name, value in self.counters.items():
+            lines.append(f"{COUNTER_LABELS[name]:<24} {value:>10}")
+        if self.token_kinds:
+            lines.append("")
+            lines.append("Токены по видам:")
+            lines.extend(f"  {name:<22} {count:>10}" for name, count in self.token_kinds.items())
+        if self.node_kinds:
+            lines.append("")
+            lines.append("Узлы по видам:")
+            lines.extend(f"  {name:<22} {count:>10}" for name, count in self.node_kinds.items())
+        if self.memory_phases:
+            lines.append("")
+            lines.append(f"{'память':<12} {'пик, МБ':>10} {'осталось, МБ':>13}")
+            for name, (peak, retained, top) in self.memory_phases.items():
+                lines.append(f"{name:<12} {peak / MB:>10.2f} {retained / MB:>13.2f}")
+                lines.extend(f"  {where:<24} {size / 1024:>+10.1f} КБ {count:>9} блоков"
+                             for where, size, count in top)
+        return "\n".join(lines)
+
+
+class MemoryBudget:
+    """Предел памяти на одну компиляцию в байтах (по данным tracemalloc).
+
+    expect() останавливает компиляцию до фазы, которой по оценке не хватит
+    памяти, check() — как только предел уже превышен. В обоих случаях
+    поднимается BudgetExceeded с понятным текстом, а не MemoryError посреди
+    разбора или убийство процесса системой.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.base = 0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.base = tracemalloc.get_traced_memory()[0]
+
+    def used(self):
+        return tracemalloc.get_traced_memory()[0] - self.base
+
+    def expect(self, what, extra):
+        need = self.used() + extra
+        if need > self.limit:
+            raise BudgetExceeded(
+                f"Превышен бюджет памяти {self.limit / MB:.1f} МБ: "
+                f"{what} потребует около {need / MB:.1f} МБ"
+            )
+
+    def check(self, what):
+        used = self.used()
+        if used > self.limit:
+            raise BudgetExceeded(
+                f"Превышен бюджет памяти {self.limit / MB:.1f} МБ: "
+                f"{what} занял {used / MB:.1f} МБ"
+            )
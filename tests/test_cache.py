@@ -0,0 +1,34 @@
+import cache as cache_module
+from cache import CompileCache
+
+
+def directory_size(cache):
+    return sum(size for _, size, _ in cache.entries())
+
+
+def test_put_keeps_running_total(tmp_path, monkeypatch):
+    cache = CompileCache(str(tmp_path), limit=8000)
+    scans = []
+    entries = CompileCache.entries
+    monkeypatch.setattr(CompileCache, "entries",
+                        lambda self: scans.append(1) or entries(self))
+    for i in range(200):
+        cache.put(cache.key(str(i).encode()), bytes(range(256)) * (i % 7))
+    # каталог просматривается при первой записи и при переполнении, а не
+    # на каждой записи
+    assert 1 < len(scans) < 50
+    assert directory_size(cache) <= cache.limit
+    assert cache.get(cache.key(b"199")) == bytes(range(256)) * (199 % 7)
+
+
+def test_rescan_every_scan_every_puts(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "SCAN_EVERY", 10)
+    cache = CompileCache(str(tmp_path))
+    other = CompileCache(str(tmp_path))
+    for i in range(10):
+        other.put(other.key(b"other%d" % i), b"x" * 100)
+    cache.put(cache.key(b"first"), b"y")
+    for i in range(9):
+        cache.put(cache.key(b"%d" % i), b"y")
+    # на десятой записи учтены и записи другого процесса
+    assert cache.total == directory_size(cache)
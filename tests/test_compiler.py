@@ -0,0 +1,48 @@
+import os
+
+from conftest import ROOT
+from cache import CompileCache
+from compiler import compile_file
+from lexer import Lexer
+from parser import Parser
+from stats import MemoryBudget
+
+SAMPLE = os.path.join(ROOT, "1.txt")
+
+
+def test_budget_error_is_structured_and_not_cached(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    result = compile_file(SAMPLE, cache, budget=MemoryBudget(1))
+    diagnostic, = result.diagnostics
+    assert diagnostic.phase == "budget"
+    assert diagnostic.pos is None
+    assert diagnostic.message.startswith("Превышен бюджет памяти")
+    # отказ по бюджету не попадает в кэш: без предела файл компилируется
+    result = compile_file(SAMPLE, cache)
+    assert result.ok
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def number_nodes(node):
+    stack, found = [node], []
+    while stack:
+        node = stack.pop()
+        if node.kind == "number":
+            found.append(node)
+        stack.extend(child for child in node.children if child is not None)
+    return found
+
+
+def test_number_nodes_share_table_records():
+    # Литерал разбирается один раз — в таблице 3; узлы дерева, в том
+    # числе после relex с перенумерацией, ссылаются на те же записи
+    text = "program var dim a % begin a EQ 1 plus 0ffh plus 1; a EQ 101b end."
+    lexer = Lexer(text)
+    tokens = lexer.tokenize()
+    offset = text.index("1 plus")
+    tokens = lexer.relex(tokens, offset, 1, "7 plus 5")
+    ast = Parser(tokens).parse_program()
+    records = lexer.tables[3].records
+    assert [node.value for node in number_nodes(ast)] == ["101b", "1", "0ffh", "5", "7"]
+    for node in number_nodes(ast):
+        assert any(node.literal is record for record in records)
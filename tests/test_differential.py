@@ -0,0 +1,158 @@
+import os
+import glob
+import random
+
+import pytest
+
+from conftest import ROOT
+from lexer import Lexer
+from parser import Parser
+from semantic import Semantic
+
+SAMPLES = {os.path.basename(p): open(p, encoding="utf-8").read()
+           for p in sorted(glob.glob(os.path.join(ROOT, "*.txt")))}
+
+# Числа и слова в самом конце текста, ошибки и комментарии на границах
+LEX_CASES = [
+    "x = 12",
+    "x = 0ffh",
+    "x = 1.5e+3",
+    "x = 101b",
+    "x = 1.",
+    "x = 12abc",
+    "a mult b div c",
+    "{* не закрыт",
+    "a {* x *} b {**} c",
+    "a @ b",
+    "",
+]
+
+# Куски, которые вставляются в текст при случайных правках
+PIECES = ["", " ", "\n", ";", "a", "b", "x1", "12", "1.5", "0ffh", "{*", "*}",
+          "{* x *}", "end_else", "{", "}", " EQ ", "output(a)", "loop", "(", ")",
+          "plus 1", "mult", "end", "."]
+
+
+def lex(text, engine="regex"):
+    # Токены с номерами в таблицах и сами таблицы 3, 4 или текст ошибки
+    lexer = Lexer(text, engine)
+    try:
+        tokens = lexer.tokenize()
+    except Exception as e:
+        return "error", str(e)
+    return ([(t.kind, t.value, t.offset, t.line, t.col, t.ref) for t in tokens],
+            [list(lexer.tables[3]), list(lexer.tables[4])])
+
+
+def dump(node):
+    # Дерево списком (вид, значение, позиция) в прямом порядке обхода
+    out, stack = [], [node]
+    while stack:
+        node = stack.pop()
+        out.append((node.kind, repr(node.value), node.pos))
+        stack.extend(reversed([child for child in node.children if child is not None]))
+    return out
+
+
+def check(ast, previous=None):
+    # Результат семантического анализа: None или текст ошибки, и анализатор
+    sema = Semantic()
+    try:
+        sema.analyze(ast, previous=previous)
+    except Exception as e:
+        return str(e), sema
+    return None, sema
+
+
+def compile_text(text):
+    # Эталон для правок: полный разбор и анализ текста
+    try:
+        tokens = Lexer(text).tokenize()
+    except Exception as e:
+        return "lexical", str(e)
+    try:
+        ast = Parser(tokens).parse_program()
+    except Exception as e:
+        return "syntax", str(e)
+    return dump(ast), check(ast)[0]
+
+
+def random_edit(rng, text):
+    offset = rng.randint(0, len(text))
+    deleted = rng.randint(0, min(6, len(text) - offset))
+    inserted = "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 2)))
+    return offset, deleted, inserted
+
+
+@pytest.mark.parametrize("text", list(SAMPLES.values()) + LEX_CASES)
+def test_engines_match(text):
+    assert lex(text, "char") == lex(text, "regex")
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_relex_matches_tokenize(seed):
+    rng = random.Random(seed)
+    for name in sorted(SAMPLES):
+        text = SAMPLES[name]
+        if lex(text)[0] == "error":
+            continue
+        lexer = Lexer(text)
+        tokens = lexer.tokenize()
+        for _ in range(10):
+            offset, deleted, inserted = random_edit(rng, text)
+            new = text[:offset] + inserted + text[offset + deleted:]
+            expected = lex(new)
+            try:
+                tokens = lexer.relex(tokens, offset, deleted, inserted)
+            except Exception as e:
+                assert expected == ("error", str(e))
+                break
+            got = ([(t.kind, t.value, t.offset, t.line, t.col, t.ref) for t in tokens],
+                   [list(lexer.tables[3]), list(lexer.tables[4])])
+            assert got == expected, (name, offset, deleted, inserted)
+            text = new
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_reparse_and_semantic_reuse_match_full(seed):
+    # relex -> reparse -> analyze(previous=...) как в окне GUI против
+    # полной компиляции того же текста
+    rng = random.Random(seed)
+    head, rest = SAMPLES["1.txt"].split("begin", 1)
+    body, tail = rest.rsplit("end.", 1)
+    for _ in range(10):
+        text = head + "begin" + body * rng.randint(1, 3) + "end." + tail
+        lexer = Lexer(text)
+        tokens = lexer.tokenize()
+        ast = Parser(tokens).parse_program()
+        sema = check(ast)[1]
+        for _ in range(6):
+            offset, deleted, inserted = random_edit(rng, text)
+            text = text[:offset] + inserted + text[offset + deleted:]
+            expected = compile_text(text)
+            try:
+                tokens = lexer.relex(tokens, offset, deleted, inserted)
+            except Exception as e:
+                assert expected == ("lexical", str(e))
+                break
+            parser = Parser(tokens)
+            try:
+                ast = (parser.reparse(ast, lexer.damage) if ast is not None
+                       else parser.parse_program())
+            except Exception as e:
+                assert expected == ("syntax", str(e))
+                ast = None
+                continue
+            error, sema = check(ast, sema)
+            assert (dump(ast), error) == expected, (offset, deleted, inserted)
+
+
+def test_deep_nesting_without_recursion():
+    # Парсер и анализатор идут по явному стеку: глубина выражений и
+    # операторов не упирается в предел рекурсии Python
+    depth = 3000
+    expr = "(" * depth + "1" + ")" * depth
+    stmts = "for (;;) {" * depth + "a EQ a plus 1" + "}" * depth
+    text = f"program var dim a % begin a EQ {expr}; {stmts} end."
+    ast = Parser(Lexer(text).tokenize()).parse_program()
+    assert check(ast)[0] is None
@@ -0,0 +1,102 @@
+import io
+import os
+import glob
+import threading
+
+import pytest
+
+from conftest import ROOT
+from lexer import Lexer
+from cache import CompileCache, CHECKED
+from compiler import compile_file
+
+SAMPLES = sorted(glob.glob(os.path.join(ROOT, "*.txt")))
+
+# Тексты на границы блоков: комментарий через несколько блоков, "*}" на
+# границе, незакрытый комментарий, число в самом конце
+EDGE_CASES = [
+    "{* a\n b\n c *}\nx = 1;",
+    "x = 1;{*" + "*" * 40 + "}\ny = 2.5e+3",
+    "{* не закрыт\n\n",
+    "a = 0ffh; b = 12",
+    "\r\nz = 1\r\n",
+    "",
+]
+
+
+def lex(run):
+    # Токены и таблицы 3, 4 или текст ошибки
+    lexer = Lexer("")
+    try:
+        tokens = run(lexer)
+    except Exception as e:
+        return "error", str(e)
+    return ([(t.kind, t.value, t.line, t.col) for t in tokens],
+            [list(lexer.tables[3]), list(lexer.tables[4])])
+
+
+def lex_text(data):
+    # Эталон: весь текст сразу (переводы строк — как при open(..., "r"))
+    text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8").read()
+    return lex(lambda lexer: Lexer.__init__(lexer, text) or lexer.tokenize())
+
+
+def read_sample(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("data", [read_sample(p) for p in SAMPLES]
+                         + [s.encode() for s in EDGE_CASES])
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+def test_chunks_match_whole_text(tmp_path, data, chunk_size):
+    path = tmp_path / "source.txt"
+    path.write_bytes(data)
+    expected = lex_text(data)
+    assert lex(lambda lexer: lexer.tokenize_file(str(path), chunk_size)) == expected
+    assert lex(lambda lexer: lexer.tokenize_file(io.BytesIO(data), chunk_size)) == expected
+
+
+def in_thread(target, *args):
+    # Канал без читателя или писателя блокирует open: работа идёт в
+    # отдельном потоке, чтобы тест падал по таймауту, а не зависал
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def write_to(path_or_fd, data):
+    with open(path_or_fd, "wb") as f:
+        f.write(data)
+
+
+@pytest.mark.parametrize("chunk_size", [5, 1 << 20])
+def test_pipe(chunk_size):
+    data = read_sample(SAMPLES[0])
+    r, w = os.pipe()
+    in_thread(write_to, w, data)
+    with open(r, "rb") as f:
+        result = lex(lambda lexer: lexer.tokenize_file(f, chunk_size))
+    assert result == lex_text(data)
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="нужен FIFO")
+def test_compile_fifo_with_cache(tmp_path):
+    # Поток читается один раз: ключ кэша и лексер берут одни и те же байты
+    sample = SAMPLES[0]
+    expected = compile_file(sample)
+    cache = CompileCache(str(tmp_path / "cache"))
+    for _ in range(2):
+        fifo = str(tmp_path / "fifo")
+        os.mkfifo(fifo)
+        writer = in_thread(write_to, fifo, read_sample(sample))
+        results = []
+        compiler = in_thread(lambda: results.append(compile_file(fifo, cache)))
+        compiler.join(10)
+        assert not compiler.is_alive(), "компиляция ждёт второго открытия FIFO"
+        writer.join()
+        os.remove(fifo)
+        result, = results
+        assert result.stage == expected.stage == CHECKED
+        assert len(result.tokens) == len(expected.tokens)
+    assert (cache.misses, cache.hits) == (1, 1)
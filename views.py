@@ -0,0 +1,305 @@
+from bisect import bisect_right
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+
+# -----------------------------
+# Вывод больших результатов во вкладки GUI
+# -----------------------------
+
+# Сколько строк вкладка показывает обычным текстом; если больше, в виджете
+# только видимые строки
+VIRTUAL_ROWS = 20000
+
+# Шаг прокрутки колесом мыши, строк
+WHEEL_ROWS = 3
+
+# Сколько детей узла AST добавляется в дерево за раз
+AST_CHUNK = 1000
+
+# Тег строки исходника, к которой перешли из дерева AST
+JUMP_TAG = "ast_jump"
+
+
+class Rows:
+    """Содержимое вкладки по строкам, которые строятся по запросу.
+
+    Части идут подряд: add(count, row) добавляет count строк, i-я из них —
+    row(i) (текст с '\\n' в конце, можно несколько строк текста). rows[i] —
+    i-я строка всего содержимого. Данные, которые читают row, не должны
+    меняться: строки строит поток окна, пока фоновый поток компилирует
+    дальше.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.parts = []
+        self.count = 0
+
+    def add(self, count, row):
+        self.starts.append(self.count)
+        self.parts.append(row)
+        self.count += count
+        return self
+
+    def lines(self, lines):
+        # Готовые строки списком
+        return self.add(len(lines), lines.__getitem__)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        k = bisect_right(self.starts, i) - 1
+        return self.parts[k](i - self.starts[k])
+
+    def text(self, start=0, stop=None):
+        stop = self.count if stop is None else min(stop, self.count)
+        return "".join([self[i] for i in range(start, stop)])
+
+
+class RowView:
+    """Вывод Rows в текстовый виджет с полосой прокрутки.
+
+    Не больше limit строк вставляются в виджет одним insert и дальше это
+    обычный текст. При большем числе строк в виджете только видимые:
+    полоса прокрутки, колесо мыши и PageUp/PageDown двигают окно по Rows,
+    и видимые строки строятся заново. Выделить и скопировать в этом
+    режиме можно только видимое.
+    """
+
+    def __init__(self, text, scrollbar, limit=VIRTUAL_ROWS):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.limit = limit
+        self.rows = None     # Rows, если вывод виртуальный
+        self.first = 0       # первая видимая строка
+        self.shown = 0       # сколько строк сейчас в виджете
+        self.linespace = None
+        text.bind("<MouseWheel>", self.on_wheel)
+        text.bind("<Button-4>", self.on_wheel)
+        text.bind("<Button-5>", self.on_wheel)
+        text.bind("<Prior>", self.on_page)
+        text.bind("<Next>", self.on_page)
+        text.bind("<Configure>", self.on_resize, add="+")
+
+    def show(self, rows):
+        self.clear()
+        if len(rows) <= self.limit:
+            self.text.insert("end", rows.text())
+            return
+        self.rows = rows
+        self.first = 0
+        # полосой прокрутки теперь управляет RowView, а не сам виджет
+        self.text.configure(yscrollcommand="")
+        self.scrollbar.configure(command=self.yview)
+        self.render()
+
+    def clear(self):
+        if self.rows is not None:
+            self.rows = None
+            self.text.configure(yscrollcommand=self.scrollbar.set)
+            self.scrollbar.configure(command=self.text.yview)
+        self.text.delete("1.0", "end")
+
+    def height(self):
+        # Сколько строк текста помещается в виджет
+        if self.linespace is None:
+            self.linespace = tkfont.Font(font=self.text.cget("font")).metrics("linespace")
+        return max(1, self.text.winfo_height() // self.linespace)
+
+    def render(self):
+        rows, height = self.rows, self.height()
+        count = len(rows)
+        self.first = max(0, min(self.first, count - height))
+        chunk, lines, i = [], 0, self.first
+        while i < count and lines < height:
+            row = rows[i]
+            chunk.append(row)
+            lines += row.count("\n") or 1
+            i += 1
+        self.shown = i - self.first
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", "".join(chunk))
+        self.scrollbar.set(self.first / count, i / count)
+
+    def scroll(self, first):
+        if self.rows is None:
+            return
+        first = max(0, first)
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def yview(self, *args):
+        # Команда полосы прокрутки: moveto доля | scroll n units|pages
+        if args[0] == "moveto":
+            self.scroll(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            step = self.shown if args[2] == "pages" else 1
+            self.scroll(self.first + int(args[1]) * step)
+
+    def on_wheel(self, event):
+        if self.rows is None:
+            return None
+        if event.num == 4 or event.delta > 0:
+            self.scroll(self.first - WHEEL_ROWS)
+        else:
+            self.scroll(self.first + WHEEL_ROWS)
+        return "break"
+
+    def on_page(self, event):
+        if self.rows is None:
+            return None
+        step = self.shown if event.keysym == "Next" else -self.shown
+        self.scroll(self.first + step)
+        return "break"
+
+    def on_resize(self, event):
+        if self.rows is not None:
+            self.render()
+
+
+# -----------------------------
+# AST: дерево с раскрытием по запросу и выгрузка в текст
+# -----------------------------
+
+def node_children(node):
+    return [child for child in node.children if child is not None]
+
+
+def node_label(node):
+    # Строка узла: вид, значение и позиция в исходнике
+    text = node.kind
+    if node.value is not None:
+        text += f": {node.value}"
+    pos = node.pos
+    if pos:
+        text += f" [строка {pos[0]}, столбец {pos[1]}]"
+    return text
+
+
+def node_position(node):
+    # Позиция узла или первого потомка, у которого она есть
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if item.pos:
+            return item.pos
+        stack.extend(reversed(node_children(item)))
+    return None
+
+
+def write_ast(node, out):
+    # Всё дерево в out по строке на узел, с отступом в два пробела на
+    # уровень; обход без рекурсии, общая строка не собирается
+    write = out.write
+    stack = [(node, 0)]
+    while stack:
+        node, depth = stack.pop()
+        write("  " * depth + node_label(node) + "\n")
+        stack.extend((child, depth + 1) for child in reversed(node_children(node)))
+
+
+class AstView:
+    """Дерево AST в ttk.Treeview.
+
+    Строки детей создаются, только когда узел раскрывают, и не больше
+    AST_CHUNK за раз: остальные — по строке «ещё N узлов». Двойной щелчок
+    или Enter на узле переводит курсор source (Text исходника) на его
+    позицию. export(out) пишет всё дерево текстом через write_ast.
+
+    Узлы читаются из потока окна, пока фоновый поток может разбирать
+    следующую правку на месте, поэтому перед новой компиляцией вид нужно
+    очистить (clear).
+    """
+
+    def __init__(self, parent, source=None):
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, show="tree", selectmode="browse")
+        yscroll = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        xscroll = tk.Scrollbar(self.frame, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(yscrollcommand=yscroll.set, xscrollcommand=xscroll.set)
+        yscroll.pack(side=tk.RIGHT, fill=tk.Y)
+        xscroll.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.source = source
+        if source is not None:
+            source.tag_configure(JUMP_TAG, background="#fff3b0")
+        self.root = None
+        self.nodes = {}      # строка дерева -> Node
+        self.pending = {}    # строка-заглушка -> (узел, с какого ребёнка)
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
+        self.tree.bind("<Double-1>", self.on_activate)
+        self.tree.bind("<Return>", self.on_activate)
+
+    def show(self, node):
+        self.clear()
+        self.root = node
+        self.add("", node)
+
+    def clear(self):
+        self.root = None
+        self.nodes.clear()
+        self.pending.clear()
+        self.tree.delete(*self.tree.get_children())
+
+    def add(self, parent, node):
+        iid = self.tree.insert(parent, "end", text=node_label(node))
+        self.nodes[iid] = node
+        if node_children(node):
+            # заглушка, чтобы у узла был значок раскрытия
+            self.pending[self.tree.insert(iid, "end", text="...")] = (node, 0)
+        return iid
+
+    def expand(self, iid):
+        # Заглушка среди детей iid (или сама строка «ещё N») -> следующие
+        # AST_CHUNK детей
+        if iid not in self.pending:
+            placeholders = [c for c in self.tree.get_children(iid) if c in self.pending]
+            if not placeholders:
+                return
+            iid = placeholders[0]
+        node, start = self.pending.pop(iid)
+        parent = self.tree.parent(iid)
+        self.tree.delete(iid)
+        children = node_children(node)
+        for child in children[start:start + AST_CHUNK]:
+            self.add(parent, child)
+        rest = len(children) - start - AST_CHUNK
+        if rest > 0:
+            more = self.tree.insert(parent, "end", text=f"... ещё {rest} узлов")
+            self.pending[more] = (node, start + AST_CHUNK)
+
+    def on_open(self, event):
+        self.expand(self.tree.focus())
+
+    def on_activate(self, event):
+        iid = self.tree.focus()
+        if iid in self.pending:
+            self.expand(iid)
+        else:
+            self.jump(iid)
+        return "break"
+
+    def jump(self, iid):
+        # Курсор исходника на позицию узла iid; False, если позиции нет
+        node = self.nodes.get(iid)
+        pos = node_position(node) if node is not None else None
+        if self.source is None or pos is None:
+            return False
+        line, col = pos
+        index = f"{line}.{col - 1}"
+        self.source.tag_remove(JUMP_TAG, "1.0", "end")
+        self.source.tag_add(JUMP_TAG, f"{line}.0", f"{line}.0 lineend")
+        self.source.mark_set("insert", index)
+        self.source.see(index)
+        self.source.focus_set()
+        return True
+
+    def export(self, out):
+        # False, если дерева нет
+        if self.root is None:
+            return False
+        write_ast(self.root, out)
+        return True
@@ -0,0 +1,424 @@
+import sys
+from array import array
+from lexer import NumberTable
+from literals import decode_number, number_type
+
+# -----------------------------
+# Байт-код
+# -----------------------------
+
+# Коды операций. Команда — пара (операция, аргумент); аргумент нужен
+# CONST (номер в пуле констант), LOAD/STORE/INPUT (слот переменной)
+# и переходам (номер слова в коде). Арифметика с целым результатом —
+# отдельные команды IADD/ISUB/IMUL с проверкой переполнения
+(LOAD, CONST, STORE, TO_REAL, IADD, ISUB, IMUL, ADD, SUB, MUL, DIV,
+ EQ, NE, LT, LE, GT, GE, AND, OR, NOT,
+ JUMP, JUMP_FALSE, POP, INPUT, OUTPUT, HALT) = range(26)
+
+OP_NAMES = ("LOAD", "CONST", "STORE", "TO_REAL", "IADD", "ISUB", "IMUL", "ADD", "SUB", "MUL", "DIV",
+            "EQ", "NE", "LT", "LE", "GT", "GE", "AND", "OR", "NOT",
+            "JUMP", "JUMP_FALSE", "POP", "INPUT", "OUTPUT", "HALT")
+
+BINARY_OPS = {
+    "plus": ADD, "min": SUB, "mult": MUL, "div": DIV,
+    "eq": EQ, "ne": NE, "lt": LT, "le": LE, "gt": GT, "ge": GE,
+    "and": AND, "or": OR,
+}
+INT_OPS = {ADD: IADD, SUB: ISUB, MUL: IMUL}
+
+# Целые (%) — 64-битные со знаком
+INT_MIN, INT_MAX = -(1 << 63), (1 << 63) - 1
+
+# Начальные значения переменных по типу
+ZERO = {"%": 0, "!": 0.0, "$": False}
+
+
+def arith_type(op, left, right):
+    # Тип результата операции по правилам semantic.py
+    if op in ("plus", "min", "mult", "div"):
+        return "!" if "!" in (left, right) else "%"
+    return "$"
+
+
+def format_value(value):
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return str(value)
+
+
+class Bytecode:
+    """Программа для VM.
+
+    code — слова (операция, аргумент) подряд, consts — пул констант:
+    true, false и значения чисел таблицы 3 в её порядке. names и
+    types — переменные по слотам, offsets — смещения в исходнике для
+    команд, которые могут упасть при выполнении (DIV, INPUT и целая
+    арифметика).
+    """
+
+    def __init__(self, code, consts, names, types, offsets, lines):
+        self.code = code
+        self.consts = consts
+        self.names = names
+        self.types = types
+        self.offsets = offsets
+        self.lines = lines
+
+    def __len__(self):
+        # число команд
+        return len(self.code) // 2
+
+    def disassemble(self):
+        lines = []
+        for pc in range(0, len(self.code), 2):
+            op, arg = self.code[pc], self.code[pc + 1]
+            text = f"{pc:6} {OP_NAMES[op]:<10}"
+            if op == CONST:
+                text += f" {arg} ({format_value(self.consts[arg])})"
+            elif op in (LOAD, STORE, INPUT):
+                text += f" {arg} ({self.names[arg]})"
+            elif op in (JUMP, JUMP_FALSE):
+                text += f" {arg}"
+            lines.append(text)
+        return "\n".join(lines)
+
+
+class CodeGen:
+    """Перевод проверенного дерева (после Semantic) в Bytecode.
+
+    Обход без рекурсии, как в Semantic: операторы — генераторы, которые
+    отдают вложенные операторы через yield, выражения выводятся в
+    обратном порядке обхода. numbers — таблица 3 лексера; из неё
+    строится пул констант.
+    """
+
+    def __init__(self, numbers=None):
+        self.code = array("i")
+        self.pool = NumberTable(numbers or ())
+        self.slots = {}
+        self.types = []
+        self.offsets = {}
+        self.lines = None
+
+    def emit(self, op, arg=0):
+        self.code.append(op)
+        self.code.append(arg)
+        return len(self.code) - 2
+
+    def here(self):
+        return len(self.code)
+
+    def patch(self, at, target):
+        self.code[at + 1] = target
+
+    def compile(self, program):
+        decl = program.children[0]
+        self.lines = decl.lines
+        for var in decl.children:
+            self.slots[var.value] = len(self.types)
+            self.types.append(decl.value)
+        for stmt in program.children[1:]:
+            self.statement(stmt)
+        self.emit(HALT)
+        consts = [True, False] + [record.value for record in self.pool.records]
+        return Bytecode(self.code, consts, list(self.slots),
+                        self.types, self.offsets, self.lines)
+
+    def statement(self, node):
+        stack = []
+        gen = getattr(self, "stmt_" + node.kind)(node)
+        if gen is not None:
+            stack.append(gen)
+        while stack:
+            try:
+                child = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                continue
+            gen = getattr(self, "stmt_" + child.kind)(child)
+            if gen is not None:
+                stack.append(gen)
+
+    # ---------- операторы ----------
+
+    def stmt_assign(self, node):
+        self.store(node.value, node.children[0])
+
+    def stmt_input(self, node):
+        for name in node.value:
+            self.offsets[self.here()] = node.offset
+            self.emit(INPUT, self.slots[name])
+
+    def stmt_output(self, node):
+        self.expression(node.children[0])
+        self.emit(OUTPUT)
+
+    def stmt_compound(self, node):
+        for stmt in node.children:
+            yield stmt
+
+    def stmt_if(self, node):
+        cond, then, other = node.children
+        self.expression(cond)
+        jump = self.emit(JUMP_FALSE)
+        yield then
+        if other is not None:
+            end = self.emit(JUMP)
+            self.patch(jump, self.here())
+            yield other
+            self.patch(end, self.here())
+        else:
+            self.patch(jump, self.here())
+
+    def stmt_while(self, node):
+        cond, body = node.children
+        top = self.here()
+        self.expression(cond)
+        jump = self.emit(JUMP_FALSE)
+        yield body
+        self.emit(JUMP, top)
+        self.patch(jump, self.here())
+
+    def stmt_for(self, node):
+        init, cond, inc, body = node.children
+        if init is not None:
+            self.effect(init)
+        top = self.here()
+        jump = None
+        if cond is not None:
+            self.expression(cond)
+            jump = self.emit(JUMP_FALSE)
+        yield body
+        if inc is not None:
+            self.effect(inc)
+        self.emit(JUMP, top)
+        if jump is not None:
+            self.patch(jump, self.here())
+
+    def effect(self, node):
+        # Начало и шаг for разбираются как выражения; "x eq выражение"
+        # там — присваивание (как пишут в примерах), остальное
+        # вычисляется и отбрасывается
+        if node.kind == "binop" and node.value == "eq" and node.children[0].kind == "id":
+            self.store(node.children[0].value, node.children[1])
+        else:
+            self.expression(node)
+            self.emit(POP)
+
+    def store(self, name, expr):
+        slot = self.slots[name]
+        if self.expression(expr) != self.types[slot]:
+            # % в ! — единственное неявное преобразование
+            self.emit(TO_REAL)
+        self.emit(STORE, slot)
+
+    # ---------- выражения ----------
+
+    def expression(self, node):
+        # Код выражения; возвращает его тип
+        order = []
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            order.append(item)
+            stack.extend(item.children)
+        types = []
+        for item in reversed(order):
+            kind = item.kind
+            if kind == "id":
+                slot = self.slots[item.value]
+                self.emit(LOAD, slot)
+                types.append(self.types[slot])
+            elif kind == "number":
+                # номер в таблице 3 (с 1) + true и false в начале пула
+                self.emit(CONST, self.pool.intern(item.value, item.literal) + 1)
+                types.append(item.literal.type)
+            elif kind == "bool":
+                self.emit(CONST, 0 if item.value == "true" else 1)
+                types.append("$")
+            elif kind == "unop":
+                self.emit(NOT)
+            else:
+                right = types.pop()
+                types[-1] = typ = arith_type(item.value, types[-1], right)
+                op = BINARY_OPS[item.value]
+                if typ == "%":
+                    op = INT_OPS[op]
+                if op == DIV or op in INT_OPS.values():
+                    self.offsets[self.here()] = item.offset
+                self.emit(op)
+        return types[0]
+
+
+def compile_program(program, numbers=None):
+    # Байт-код для program; numbers — таблица 3 (Lexer.tables[3])
+    return CodeGen(numbers).compile(program)
+
+
+# -----------------------------
+# Виртуальная машина
+# -----------------------------
+
+def read_words(f):
+    # Входные данные для input: слова, разделённые пробелами и переводами строк
+    for line in f:
+        yield from line.split()
+
+
+def parse_input(word, typ):
+    # Значение типа typ из слова входных данных (или None, если не подходит)
+    if typ == "$":
+        return {"true": True, "false": False}.get(word)
+    sign = -1 if word[:1] == "-" else 1
+    try:
+        value = decode_number(word[1:] if sign < 0 else word)
+    except ValueError:
+        return None
+    if typ == "%":
+        return sign * value if number_type(word) == "%" else None
+    return sign * float(value)
+
+
+class VM:
+    """Стековая машина для Bytecode.
+
+    inp — итератор слов для input (по умолчанию слова из stdin), out —
+    файл для output, max_steps — предел числа команд (None — без предела;
+    проверяется на переходах, так что программа без циклов его не
+    превысит). После run() в steps — сколько команд выполнено, в vars —
+    значения переменных.
+    """
+
+    def __init__(self, bytecode, inp=None, out=None, max_steps=None):
+        self.bytecode = bytecode
+        self.inp = inp if inp is not None else read_words(sys.stdin)
+        self.out = out if out is not None else sys.stdout
+        self.max_steps = max_steps
+        self.vars = [ZERO[t] for t in bytecode.types]
+        self.steps = 0
+
+    def error(self, pc, message):
+        offset = self.bytecode.offsets.get(pc)
+        if offset is None:
+            return Exception(f"Ошибка выполнения: {message}")
+        line, col = self.bytecode.lines.position(offset)
+        return Exception(f"Ошибка выполнения на {line}:{col}: {message}")
+
+    def run(self):
+        code = self.bytecode.code.tolist()
+        consts = self.bytecode.consts
+        variables = self.vars
+        stack = []
+        push, pop = stack.append, stack.pop
+        write = self.out.write
+        limit = self.max_steps if self.max_steps is not None else float("inf")
+        pc = steps = 0
+        try:
+            # Команды проверяются в порядке частоты
+            while True:
+                op = code[pc]
+                pc += 2
+                steps += 1
+                if op == LOAD:
+                    push(variables[code[pc - 1]])
+                elif op == CONST:
+                    push(consts[code[pc - 1]])
+                elif op == STORE:
+                    variables[code[pc - 1]] = pop()
+                elif op == JUMP_FALSE:
+                    if not pop():
+                        pc = code[pc - 1]
+                elif op == JUMP:
+                    pc = code[pc - 1]
+                    if steps > limit:
+                        raise self.error(pc, f"превышен предел в {self.max_steps} команд")
+                elif op == IADD:
+                    b = pop()
+                    b += stack[-1]
+                    if not INT_MIN <= b <= INT_MAX:
+                        raise OverflowError
+                    stack[-1] = b
+                elif op == IMUL:
+                    b = pop()
+                    b *= stack[-1]
+                    if not INT_MIN <= b <= INT_MAX:
+                        raise OverflowError
+                    stack[-1] = b
+                elif op == ISUB:
+                    b = pop()
+                    b = stack[-1] - b
+                    if not INT_MIN <= b <= INT_MAX:
+                        raise OverflowError
+                    stack[-1] = b
+                elif op == ADD:
+                    b = pop()
+                    stack[-1] += b
+                elif op == SUB:
+                    b = pop()
+                    stack[-1] -= b
+                elif op == MUL:
+                    b = pop()
+                    stack[-1] *= b
+                elif op == LT:
+                    b = pop()
+                    stack[-1] = stack[-1] < b
+                elif op == GT:
+                    b = pop()
+                    stack[-1] = stack[-1] > b
+                elif op == LE:
+                    b = pop()
+                    stack[-1] = stack[-1] <= b
+                elif op == GE:
+                    b = pop()
+                    stack[-1] = stack[-1] >= b
+                elif op == EQ:
+                    b = pop()
+                    stack[-1] = stack[-1] == b
+                elif op == NE:
+                    b = pop()
+                    stack[-1] = stack[-1] != b
+                elif op == AND:
+                    b = pop()
+                    stack[-1] = stack[-1] and b
+                elif op == OR:
+                    b = pop()
+                    stack[-1] = stack[-1] or b
+                elif op == NOT:
+                    stack[-1] = not stack[-1]
+                elif op == DIV:
+                    b = pop()
+                    stack[-1] /= b
+                elif op == TO_REAL:
+                    stack[-1] = float(stack[-1])
+                elif op == OUTPUT:
+                    write(format_value(pop()) + "\n")
+                elif op == POP:
+                    pop()
+                elif op == INPUT:
+                    self.input(pc - 2, code[pc - 1])
+                else:
+                    break
+        except ZeroDivisionError:
+            raise self.error(pc - 2, "деление на ноль") from None
+        except OverflowError:
+            raise self.error(pc - 2, "переполнение") from None
+        finally:
+            self.steps = steps
+        return self
+
+    def input(self, pc, slot):
+        name, typ = self.bytecode.names[slot], self.bytecode.types[slot]
+        word = next(self.inp, None)
+        if word is None:
+            raise self.error(pc, f"нет входных данных для '{name}'")
+        value = parse_input(word, typ)
+        if value is None:
+            raise self.error(pc, f"'{word}' не является значением типа {typ} для '{name}'")
+        self.vars[slot] = value
+
+
+def run_program(program, numbers=None, inp=None, out=None, max_steps=None):
+    # Компиляция в байт-код и выполнение; возвращает VM
+    return VM(compile_program(program, numbers), inp, out, max_steps).run()
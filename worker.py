@@ -0,0 +1,117 @@
+import queue
+import threading
+from functools import partial
+from diagnostics import Cancelled
+
+# -----------------------------
+# Фоновая компиляция для GUI
+# -----------------------------
+
+# Как часто окно забирает сообщения из очереди, мс
+POLL_MS = 50
+
+
+def check_cancel(cancel):
+    # Для долгих шагов задания вне лексера, парсера и анализатора
+    # (подготовка текстов вкладок): Cancelled, если задание отменено
+    if cancel is not None and cancel.is_set():
+        raise Cancelled()
+
+
+class CompileWorker:
+    """Задания компиляции в фоновом потоке.
+
+    submit(job) ставит задание: в потоке вызывается job(cancel, post),
+    где cancel — threading.Event для Lexer/Parser/Semantic, а post(вид,
+    данные) отправляет сообщение окну. В конце задания worker сам
+    отправляет "done" (с результатом job), "error" (с исключением) или
+    "cancelled". Окно забирает сообщения через widget.after() и
+    передаёт их handle(вид, данные) — виджеты Tk трогает только поток
+    окна.
+
+    Новое задание отменяет текущее, если оно ещё идёт, и заменяет
+    ожидающее; сообщения заданий, кроме последнего, отбрасываются.
+    Задания выполняются по одному, так что состояние инкрементального
+    разбора в окне меняет только один поток.
+    """
+
+    def __init__(self, widget, handle, poll_ms=POLL_MS):
+        self.widget = widget
+        self.handle = handle
+        self.poll_ms = poll_ms
+        self.messages = queue.Queue()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.latest = 0          # номер последнего задания
+        self.pending = None      # (номер, job, cancel) ещё не начатого
+        self.running = None      # cancel выполняемого
+        self.active = False      # окно ждёт конца последнего задания
+        self.thread = None
+
+    def submit(self, job):
+        # Номер задания; сообщения с другими номерами окну не попадут
+        with self.lock:
+            self.latest += 1
+            if self.running is not None:
+                self.running.set()
+            self.pending = (self.latest, job, threading.Event())
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="compile", daemon=True)
+                self.thread.start()
+            self.wakeup.notify()
+        if not self.active:
+            self.active = True
+            self.widget.after(self.poll_ms, self.poll)
+        return self.latest
+
+    def cancel(self):
+        # Отмена текущего и ожидающего заданий; False — отменять нечего
+        with self.lock:
+            if self.pending is not None:
+                number = self.pending[0]
+                self.pending = None
+                self.messages.put((number, "cancelled", None))
+                return True
+            if self.running is not None:
+                self.running.set()
+                return True
+        return False
+
+    def run(self):
+        while True:
+            with self.lock:
+                while self.pending is None:
+                    self.wakeup.wait()
+                number, job, cancel = self.pending
+                self.pending = None
+                self.running = cancel
+            post = partial(self.post, number)
+            try:
+                result = job(cancel, post)
+            except Cancelled:
+                post("cancelled")
+            except Exception as e:
+                post("error", e)
+            else:
+                post("done", result)
+            finally:
+                with self.lock:
+                    self.running = None
+
+    def post(self, number, kind, data=None):
+        self.messages.put((number, kind, data))
+
+    def poll(self):
+        # Поток окна: сообщения последнего задания — в handle
+        while True:
+            try:
+                number, kind, data = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if number != self.latest:
+                continue
+            if kind in ("done", "error", "cancelled"):
+                self.active = False
+            self.handle(kind, data)
+        if self.active:
+            self.widget.after(self.poll_ms, self.poll)